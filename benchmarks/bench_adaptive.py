@@ -0,0 +1,43 @@
+"""
+Benchmark of RegexGenerator.generate
+with the static parameters and the adaptive (adaptive=True) mode
+
+The throughput is the number of accepted regex per second
+over DURATION seconds of generation.
+
+Usage:
+```python benchmarks/bench_adaptive.py```
+"""
+import time
+from rbloom import Bloom
+from random_regex import RegexGenerator
+
+# (max_length, max_complexity)
+SETTINGS = [(8, 100), (12, 100), (20, 1000), (40, 1000)]
+DURATION = 10.
+
+
+def throughput(**kwargs) -> float:
+    regex_generator = RegexGenerator(
+        bloom_cls=Bloom, item_count=1000000, seed=0, **kwargs)
+    results = regex_generator.generate()
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < DURATION:
+        next(results)
+        count += 1
+    seconds = time.perf_counter() - start
+    results.close()
+    return count / seconds
+
+
+if __name__ == '__main__':
+    print('max_length max_complexity  static(/s)  adaptive(/s)  speedup')
+    for max_length, max_complexity in SETTINGS:
+        rates = [
+            throughput(max_length=max_length, max_complexity=max_complexity,
+                       adaptive=adaptive)
+            for adaptive in (False, True)
+        ]
+        print(f'{max_length:10d} {max_complexity:14d} {rates[0]:11.1f} '
+              f'{rates[1]:13.1f} {rates[1] / rates[0]:8.2f}x')
@@ -0,0 +1,27 @@
+"""
+Benchmark of PatternGenerator.get_random_pattern
+with the "regexfactory" and the "string" backends
+
+Usage:
+```python benchmarks/bench_backend.py```
+"""
+import random
+import timeit
+from random_regex.generator.random_pattern import PatternGenerator
+from bench_groups import BASE, SETTINGS, NUMBER
+
+
+if __name__ == '__main__':
+    print('depth breadth  regexfactory(ms)  string(ms)  speedup')
+    for depth, breadth in SETTINGS:
+        timings = []
+        for backend in ('regexfactory', 'string'):
+            pattern_generator = PatternGenerator(
+                depth_complexity=depth, breadth_complexity=breadth,
+                lazy_groups=True, **dict(BASE, backend=backend))
+            random.seed(0)
+            seconds = timeit.timeit(
+                pattern_generator.get_random_pattern, number=NUMBER)
+            timings.append(seconds / NUMBER * 1000)
+        print(f'{depth:5d} {breadth:7d} {timings[0]:17.3f} {timings[1]:11.3f} '
+              f'{timings[0] / timings[1]:8.2f}x')
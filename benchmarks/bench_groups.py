@@ -0,0 +1,39 @@
+"""
+Benchmark of PatternGenerator.get_random_pattern
+with the eager and the lazy (lazy_groups=True) group construction
+
+Usage:
+```python benchmarks/bench_groups.py```
+"""
+import random
+import timeit
+from random_regex.generator.random_pattern import PatternGenerator
+
+BASE = {
+    'set_complexity': 2,
+    'union_complexity': 2,
+    'amount_complexity': 4,
+    'group_complexity': 10,
+    'special_char_prob': 0.5,
+    'complex_char_prob': 0.5,
+    'complex_group_prob': 0.5,
+    'backend': 'string'
+}
+SETTINGS = [(0, 3), (1, 3), (1, 5), (2, 5)]
+NUMBER = 200
+
+
+if __name__ == '__main__':
+    print('depth breadth    eager(ms)  lazy(ms)  speedup')
+    for depth, breadth in SETTINGS:
+        timings = []
+        for lazy in (False, True):
+            pattern_generator = PatternGenerator(
+                depth_complexity=depth, breadth_complexity=breadth,
+                lazy_groups=lazy, **BASE)
+            random.seed(0)
+            seconds = timeit.timeit(
+                pattern_generator.get_random_pattern, number=NUMBER)
+            timings.append(seconds / NUMBER * 1000)
+        print(f'{depth:5d} {breadth:7d} {timings[0]:12.3f} {timings[1]:9.3f} '
+              f'{timings[0] / timings[1]:8.2f}x')
@@ -0,0 +1,352 @@
+"""
+Benchmark suite of every generation and validation stage
+
+Each benchmark runs on fixed seeds, so that the same work is timed
+between two runs, and reports the best time per operation
+over REPEAT repeats. The results are saved as JSON:
+
+{"meta": {"version": ..., "commit": ..., "python": ..., ...},
+ "results": {"<group>/<name>": {"seconds": <best seconds per op>,
+                                "ops": <ops per repeat>}, ...}}
+
+Usage:
+```python benchmarks/suite.py --output results.json```
+```python benchmarks/suite.py --output new.json --compare results.json```
+(`--compare` lists the benchmarks slower than `--threshold` times the baseline,
+and exits with 1 if any)
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import typing
+from itertools import islice
+from toolz.functoolz import pipe
+from random_regex import RegexGenerator
+from random_regex.generator.cache import LRUCache
+from random_regex.generator.canonical import canonicalize
+from random_regex.generator.random_pattern import CharGenerator, PatternGenerator
+from random_regex.generator.rng import StreamRandom
+from random_regex.version import VERSION
+
+REPEAT = 5
+SEED = 0
+# (depth_complexity, breadth_complexity)
+SETTINGS = [(0, 3), (1, 3), (1, 5), (2, 5)]
+CORPUS_SIZE = 200
+BLOOM_ITEMS = 20000
+END_TO_END = 200
+
+BENCHMARKS: typing.Dict[str, typing.Callable[[], typing.Dict[str, dict]]] = {}
+
+
+def benchmark(group: str):
+    """
+    Register a function returning {name: {'seconds': ..., 'ops': ...}}
+    """
+    def register(func):
+        BENCHMARKS[group] = func
+        return func
+    return register
+
+
+def best_time(func: typing.Callable[[], typing.Any], ops: int,
+              setup: typing.Optional[typing.Callable[[], typing.Any]] = None) -> dict:
+    """
+    Best seconds per op of `func` (doing `ops` operations) over REPEAT runs.
+    `setup` runs untimed before each run, and its result is passed to `func`.
+    """
+    timings = []
+    for _ in range(REPEAT):
+        args = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return {'seconds': min(timings) / ops, 'ops': ops}
+
+
+def rewind(rng: StreamRandom) -> None:
+    """
+    Reset the random stream to its first candidate
+    """
+    rng.seek(0)
+    rng.advance()
+
+
+def base_complexities() -> dict:
+    return RegexGenerator(stats=False).initial_complexities
+
+
+def complexity_corpus() -> typing.Tuple[RegexGenerator, typing.List[dict]]:
+    """
+    Fixed candidates passing the complexity filter (the validity filter input)
+    """
+    regex_generator = RegexGenerator(seed=SEED, stats=False)
+    candidates = pipe(regex_generator.regex_producer(),
+                      regex_generator._complexity_filter)
+    return regex_generator, list(islice(candidates, CORPUS_SIZE))
+
+
+@benchmark('char_generator')
+def bench_char_generator():
+    results = {}
+    for length in (1, 10):
+        rng = StreamRandom(SEED)
+        char_generator = CharGenerator(2, 4, rng=rng)
+        results[f'get_random_chars(length={length})'] = best_time(
+            lambda _: [char_generator.get_random_chars(length) for _ in range(1000)],
+            1000, setup=lambda: rewind(rng))
+    return results
+
+
+@benchmark('pattern_generator')
+def bench_pattern_generator():
+    results = {}
+    for depth, breadth in SETTINGS:
+        for kwargs in ({}, {'length_budget': 19, 'count_budget': 999}):
+            rng = StreamRandom(SEED)
+            pattern_generator = PatternGenerator(
+                **dict(base_complexities(), depth_complexity=depth,
+                       breadth_complexity=breadth),
+                lazy_groups=True, backend='string', rng=rng)
+
+            def run(_):
+                for _ in range(200):
+                    rng.advance()
+                    pattern_generator.get_random_pattern(**kwargs).regex
+            name = f'get_random_pattern(depth={depth},breadth={breadth}' + \
+                (',budgets)' if kwargs else ')')
+            results[name] = best_time(run, 200, setup=lambda: rng.seek(0))
+    rng = StreamRandom(SEED)
+    pattern_generator = PatternGenerator(
+        **base_complexities(), lazy_groups=True, backend='string', rng=rng)
+    patterns = []
+    for _ in range(1000):
+        rng.advance()
+        patterns.append(pattern_generator.get_random_pattern())
+    results['canonicalize'] = best_time(
+        lambda: [canonicalize(x).regex for x in patterns], len(patterns))
+    return results
+
+
+@benchmark('count_and_expand')
+def bench_count_and_expand():
+    import exrex
+    _, corpus = complexity_corpus()
+
+    def exrex_generates(x):
+        # exrex fails on some patterns, e.g., when a group yields a list
+        try:
+            list(islice(exrex.generate(x['regex']), x['complexity'] + 1))
+            return True
+        except TypeError:
+            return False
+    exrex_corpus = [x for x in corpus if exrex_generates(x)]
+    results = {
+        'native.count': best_time(
+            lambda: [x['pattern'].count(cap=1000) for x in corpus], len(corpus)),
+        'native.expand': best_time(
+            lambda: [list(islice(x['pattern'].expand(), x['complexity'] + 1))
+                     for x in corpus], len(corpus)),
+        'exrex.count': best_time(
+            lambda: [exrex.count(x['regex']) for x in corpus], len(corpus)),
+        'exrex.generate': best_time(
+            lambda: [list(islice(exrex.generate(x['regex']), x['complexity'] + 1))
+                     for x in exrex_corpus], len(exrex_corpus))
+    }
+    return results
+
+
+@benchmark('validity_filter')
+def bench_validity_filter():
+    regex_generator, corpus = complexity_corpus()
+
+    def fresh(stages):
+        def setup():
+            re.purge()
+            regex_generator._regex_cache = LRUCache(1024)
+            rewind(regex_generator.rng)
+            items = [dict(x) for x in corpus]
+            for stage in stages:
+                items = [stage(x) for x in items]
+            return items
+        return setup
+
+    add_compiled = regex_generator._add_compiled
+    add_examples = regex_generator._add_examples
+    return {
+        '_add_compiled': best_time(
+            lambda items: [add_compiled(x) for x in items],
+            len(corpus), setup=fresh([])),
+        '_can_fullmatch': best_time(
+            lambda items: [regex_generator._can_fullmatch(x) for x in items],
+            len(corpus), setup=fresh([add_compiled])),
+        '_add_examples': best_time(
+            lambda items: [add_examples(x) for x in items],
+            len(corpus), setup=fresh([add_compiled])),
+        'examples_filter': best_time(
+            lambda items: [isinstance(x['examples'], list) and
+                           len(x['examples']) == x['complexity'] for x in items],
+            len(corpus), setup=fresh([add_compiled, add_examples])),
+        '_drop_state': best_time(
+            lambda items: [regex_generator._drop_state(x) for x in items],
+            len(corpus), setup=fresh([add_compiled, add_examples])),
+        '_packed': best_time(
+            lambda items: [regex_generator._packed(x['examples'], x['compiled'])
+                           for x in items if isinstance(x['examples'], list)],
+            len(corpus), setup=fresh([add_compiled, add_examples]))
+    }
+
+
+def bloom_backends(directory: str) -> typing.Dict[str, typing.Callable]:
+    """
+    The installed bloom filters, and the dedup store (with files in `directory`)
+    """
+    from random_regex.generator.dedup import MmapDedupStore, SharedDedupFilter
+    backends: typing.Dict[str, typing.Callable] = {}
+    try:
+        import rbloom
+        backends['rbloom'] = rbloom.Bloom
+    except ImportError:
+        pass
+    try:
+        import pybloom
+        backends['pybloom'] = pybloom.BloomFilter
+        backends['pybloom-scalable'] = pybloom.ScalableBloomFilter
+    except ImportError:
+        pass
+    try:
+        import bloom_filter
+        backends['bloom-filter'] = bloom_filter.BloomFilter
+    except ImportError:
+        pass
+    try:
+        import bloom_filter2
+        backends['bloom-filter2'] = bloom_filter2.BloomFilter
+    except ImportError:
+        pass
+    paths = itertools.count()
+
+    def mmap_dedup(capacity, error_rate):
+        path = os.path.join(directory, f'{next(paths)}.dedup')
+        return MmapDedupStore(capacity, error_rate, path=path)
+    backends['mmap-dedup'] = mmap_dedup
+
+    def shared_dedup(capacity, error_rate):
+        # a fresh segment per run:
+        shared = SharedDedupFilter(
+            capacity, error_rate, name=f'random-regex-bench-{os.getpid()}-{next(paths)}',
+            lock_path=os.path.join(directory, f'{next(paths)}.lock'))
+        shared.unlink()
+        return shared
+    backends['shared-dedup'] = shared_dedup
+    return backends
+
+
+@benchmark('filter_repeat')
+def bench_filter_repeat():
+    rng = random.Random(SEED)
+    # half of the items repeat an earlier one:
+    regexes = [f'r{rng.randrange(BLOOM_ITEMS)}' for _ in range(BLOOM_ITEMS)]
+    items = [{'regex': x} for x in regexes]
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, bloom_cls in bloom_backends(directory).items():
+            def run(regex_generator):
+                for _ in regex_generator._filter_repeat(items):
+                    pass
+
+            def setup():
+                return RegexGenerator(item_count=BLOOM_ITEMS,
+                                      bloom_cls=bloom_cls, stats=False)
+            results[name] = best_time(run, len(items), setup=setup)
+    return results
+
+
+@benchmark('end_to_end')
+def bench_end_to_end():
+    results = {}
+    for name, kwargs in (('default', {}), ('canonical', {'canonical': True}),
+                         ('constrained', {'constrained': True}),
+                         ('stats', {'stats': True})):
+        def run():
+            regex_generator = RegexGenerator(
+                seed=SEED, **dict({'stats': False}, **kwargs))
+            for _ in islice(regex_generator.generate(), END_TO_END):
+                pass
+        result = best_time(run, END_TO_END)
+        result['per_second'] = 1. / result['seconds']
+        results[f'accepted({name})'] = result
+    return results
+
+
+def metadata() -> dict:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'version': VERSION,
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'repeat': REPEAT,
+        'seed': SEED
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> typing.List[str]:
+    """
+    Names of the benchmarks slower than `threshold` times the baseline
+    """
+    regressions = []
+    for name, result in results.items():
+        if name in baseline:
+            ratio = result['seconds'] / baseline[name]['seconds']
+            if ratio > threshold:
+                regressions.append(f'{name}: {ratio:.2f}x slower')
+    return regressions
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--only', nargs='*', choices=list(BENCHMARKS),
+                        help='groups of benchmarks to run (default: all)')
+    parser.add_argument('--compare', default=None,
+                        help='results of a previous run to compare with')
+    parser.add_argument('--threshold', type=float, default=1.2)
+    args = parser.parse_args(argv)
+    results = {}
+    for group, func in BENCHMARKS.items():
+        if args.only and group not in args.only:
+            continue
+        for name, result in func().items():
+            name = f'{group}/{name}'
+            results[name] = result
+            print(f'{name:70s} {result["seconds"] * 1e6:12.2f} us/op')
+    with open(args.output, 'w') as f:
+        json.dump({'meta': metadata(), 'results': results}, f, indent=2)
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print('REGRESSION', regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
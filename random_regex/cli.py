@@ -0,0 +1,159 @@
+"""
+Command line entry point: stream random regex into dataset shards
+
+Usage:
+```random-regex --count 1000000 --shard-size 100000 --output data/ --workers 8```
+"""
+import argparse
+import functools
+import typing
+from itertools import islice
+from .generator import RegexGenerator
+from .generator.checkpoint import Checkpoint
+from .generator.dedup import MmapDedupStore, SharedDedupFilter
+from .writer import ShardWriter, FORMATS
+
+
+def _bloom_cls(name: typing.Optional[str], dedup: typing.Optional[str] = None,
+               restorable: bool = False, shared_dedup: typing.Optional[str] = None):
+    if dedup is not None:
+        return functools.partial(MmapDedupStore, path=dedup)
+    elif shared_dedup is not None:
+        return functools.partial(SharedDedupFilter, name=shared_dedup)
+    elif name is None:
+        return None
+    elif name == 'rbloom':
+        import rbloom
+        if restorable:
+            from .generator.checkpoint import stable_hash
+            return functools.partial(rbloom.Bloom, hash_func=stable_hash)
+        return rbloom.Bloom
+    elif name == 'pybloom':
+        import pybloom
+        return pybloom.BloomFilter
+    else:
+        raise ValueError(f'unknown bloom filter: {name}')
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='random-regex',
+        description='Generate random regex with their examples into dataset shards')
+    parser.add_argument('--output', required=True, help='output directory')
+    parser.add_argument('--count', type=int, required=True,
+                        help='number of regex to generate')
+    parser.add_argument('--shard-size', type=int, default=100000,
+                        help='number of regex per shard')
+    parser.add_argument('--format', choices=FORMATS, default='jsonl')
+    parser.add_argument('--buffer-size', type=int, default=1000,
+                        help='number of regex written at once')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--max-complexity', type=int, default=1000)
+    parser.add_argument('--max-length', type=int, default=20)
+    parser.add_argument('--item-count', type=int, default=None,
+                        help='expected item count of the repeat filter (default: count)')
+    parser.add_argument('--bloom-fpr', type=float, default=0.001)
+    parser.add_argument('--bloom', choices=('rbloom', 'pybloom'), default=None,
+                        help='bloom filter class (default: pybloom ScalableBloomFilter)')
+    parser.add_argument('--dedup', default=None, metavar='PATH',
+                        help='persistent dedup store shared across runs (overrides --bloom)')
+    parser.add_argument('--shared-dedup', default=None, metavar='NAME',
+                        help='shared memory dedup filter of the concurrent runs of this host (overrides --bloom)')
+    parser.add_argument('--sample-size', type=int, default=None,
+                        help='draw this many uniform examples per regex instead of enumerating all')
+    parser.add_argument('--candidate-seconds', type=float, default=None,
+                        help='reject the candidates taking longer to validate')
+    parser.add_argument('--candidate-strings', type=int, default=None,
+                        help='reject the candidates with more examples to enumerate')
+    parser.add_argument('--candidate-retries', type=int, default=None,
+                        help='with --sample-size, reject the candidates after this many draws of no new example')
+    parser.add_argument('--packed-examples', action='store_true',
+                        help='pass the examples between processes as one buffer per regex')
+    parser.add_argument('--canonical', action='store_true',
+                        help='canonicalize the regex (drop redundant groups, fold trivial quantifiers)')
+    parser.add_argument('--constrained', action='store_true',
+                        help='build the patterns within the length and complexity bounds')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='tune the pattern generator parameters online (not reproducible)')
+    parser.add_argument('--checkpoint', default=None, metavar='PATH',
+                        help='checkpoint the run at each shard, and resume it from PATH if it exists '
+                             '(the generator options are then read from the checkpoint)')
+    return parser
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> None:
+    args = build_parser().parse_args(argv)
+    checkpoint = None
+    if args.checkpoint is not None:
+        assert args.workers == 1, '--checkpoint requires --workers 1'
+        # at shard boundaries, so that the written shards are complete:
+        checkpoint = Checkpoint(args.checkpoint, every=args.shard_size)
+    resumed = False
+    if checkpoint is not None and checkpoint.exists():
+        regex_generator = checkpoint.load()
+        resumed = True
+    else:
+        regex_generator = RegexGenerator(
+            max_complexity=args.max_complexity,
+            max_length=args.max_length,
+            item_count=args.item_count or args.count,
+            bloom_fpr=args.bloom_fpr,
+            bloom_cls=_bloom_cls(args.bloom, args.dedup,
+                                 restorable=checkpoint is not None,
+                                 shared_dedup=args.shared_dedup),
+            seed=args.seed,
+            adaptive=args.adaptive,
+            constrained=args.constrained,
+            canonical=args.canonical,
+            sample_size=args.sample_size,
+            candidate_seconds=args.candidate_seconds,
+            candidate_strings=args.candidate_strings,
+            candidate_retries=args.candidate_retries,
+            packed_examples=args.packed_examples
+        )
+
+    def metadata() -> dict:
+        config = regex_generator.config
+        if config['bloom_cls'] is not None:
+            cls = config['bloom_cls']
+            if isinstance(cls, functools.partial):
+                if 'path' in cls.keywords:
+                    config['dedup'] = cls.keywords['path']
+                elif 'name' in cls.keywords:
+                    config['shared_dedup'] = cls.keywords['name']
+                cls = cls.func
+            config['bloom_cls'] = f'{cls.__module__}.{cls.__qualname__}'
+        return {
+            'generator': config,
+            'workers': args.workers,
+            'rng': regex_generator.rng.to_dict(),
+            'stats': regex_generator.stats.snapshot()
+        }
+
+    store = regex_generator.bloom \
+        if isinstance(regex_generator.bloom, MmapDedupStore) else None
+    if store is not None and not resumed:
+        # the regex added by a run stopped before writing them out
+        # (a resumed run is rolled back to its checkpoint instead):
+        store.rollback(store.commits)
+    emitted = regex_generator.emitted
+    results = regex_generator.generate(workers=args.workers, checkpoint=checkpoint)
+    with ShardWriter(args.output, shard_size=args.shard_size,
+                     fmt=args.format, buffer_size=args.buffer_size,
+                     metadata=metadata,
+                     # after the last shard (partial after a final checkpoint):
+                     start_index=-(-emitted // args.shard_size),
+                     # with a checkpoint, the store is committed by each save:
+                     on_shard=store.commit if store is not None and checkpoint is None
+                     else None) as writer:
+        for result in islice(results, args.count - emitted):
+            writer.write(result)
+    results.close()
+    if checkpoint is not None:
+        # covers the last shard:
+        checkpoint.save(regex_generator)
+
+
+if __name__ == '__main__':
+    main()
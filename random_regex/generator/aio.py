@@ -0,0 +1,103 @@
+"""
+Asyncio interface of the generation
+
+The synchronous iterator of results is advanced in an executor thread,
+one batch at a time, and its results are put into a bounded asyncio
+queue. Hence, the event loop is not blocked by the generation, a request
+only waits for a queue pop while the queue is not empty, and the
+generation pauses once `prefetch` results wait in the queue.
+
+NOTE: within a thread, the generation still shares the GIL with the
+event loop. Use processes (RegexGenerator.agenerate(workers=n)) to keep
+the CPU-bound work out of the event loop process.
+"""
+import asyncio
+import threading
+import typing
+from concurrent.futures import Executor, ThreadPoolExecutor
+from itertools import islice
+
+__all__ = ['aiterate']
+
+_END = object()
+
+
+class _Failure:
+    """
+    Exception raised by the synchronous iterator, passed through the queue
+    """
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+async def aiterate(iterator: typing.Iterator, prefetch: int = 64,
+                   batch_size: int = 4,
+                   executor: typing.Optional[Executor] = None) -> typing.AsyncIterator:
+    """
+    Iterate a synchronous iterator from asyncio without blocking the event loop
+
+    Args:
+        - iterator: the synchronous iterator, e.g., RegexGenerator.generate()
+        - prefetch: maximum number of results waiting to be consumed
+        - batch_size: number of results produced per executor call
+        - executor: thread pool running the iterator
+            (default: a dedicated single-thread pool)
+
+    Breaking out of the `async for` loop, cancelling the consumer task
+    or calling `aclose()` stops the production and closes the iterator
+    (once its in-flight batch is done).
+    """
+    assert isinstance(prefetch, int) and prefetch > 0, 'prefetch should be > 0'
+    assert isinstance(batch_size, int) and batch_size > 0, 'batch_size should be > 0'
+    loop = asyncio.get_running_loop()
+    own_executor = executor is None
+    if executor is None:
+        executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='random-regex')
+    queue: asyncio.Queue = asyncio.Queue(maxsize=prefetch)
+    # a batch and the closing of the iterator never run at the same time:
+    lock = threading.Lock()
+
+    def next_batch() -> list:
+        with lock:
+            return list(islice(iterator, batch_size))
+
+    def close() -> None:
+        with lock:
+            if hasattr(iterator, 'close'):
+                iterator.close()
+
+    async def produce() -> None:
+        try:
+            while True:
+                batch = await loop.run_in_executor(executor, next_batch)
+                for result in batch:
+                    await queue.put(result)
+                if len(batch) < batch_size:
+                    await queue.put(_END)
+                    return
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put(_Failure(e))
+
+    producer = loop.create_task(produce())
+    try:
+        while True:
+            result = await queue.get()
+            if result is _END:
+                return
+            elif isinstance(result, _Failure):
+                raise result.error
+            yield result
+    finally:
+        producer.cancel()
+        try:
+            await producer
+        except asyncio.CancelledError:
+            pass
+        # queued after the in-flight batch, without waiting for it:
+        executor.submit(close)
+        if own_executor:
+            executor.shutdown(wait=False)
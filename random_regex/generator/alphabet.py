@@ -0,0 +1,84 @@
+"""
+Integer-coded alphabet of the char-level patterns
+
+A char class is coded by the bitset (an int) of the code points of its
+members: the union of classes is `|` and the members of a NotSet are
+`ANY_MASK & ~mask`.
+
+The atoms of the Set/NotSet patterns (the special chars, then the printable
+escapes) are indexed by int, with their regex, members, bitset,
+complementary atom and rank by regex precomputed in the ATOM_* tables.
+"""
+import re
+import string
+import typing
+from .engine import ANY_CHARS, CATEGORY_CHARS
+
+__all__ = [
+    'ANY_MASK',
+    'PRINTABLES',
+    'RANGE_CHARS',
+    'SET_SPECIAL_CHARS',
+    'ATOM_REGEX',
+    'ATOM_CHARS',
+    'ATOM_MASK',
+    'ATOM_RANK',
+    'ATOM_COMPLEMENT',
+    'mask_of',
+    'chars_of'
+]
+
+PRINTABLES: typing.List[str] = []
+PRINTABLES.extend(string.ascii_letters)
+PRINTABLES.extend(string.digits)
+PRINTABLES.extend(string.hexdigits)
+PRINTABLES.extend(string.octdigits)
+PRINTABLES.extend(string.punctuation)
+
+# bounds of the Range patterns:
+RANGE_CHARS = string.printable
+
+# special chars of the sets, by complementary pairs
+SET_SPECIAL_CHARS = ('\\s', '\\S', '\\w', '\\W', '\\d', '\\D')
+
+
+def mask_of(chars: typing.Iterable[str]) -> int:
+    """
+    Bitset of a class of chars
+    """
+    mask = 0
+    for char in chars:
+        mask |= 1 << ord(char)
+    return mask
+
+
+def chars_of(mask: int) -> typing.Tuple[str, ...]:
+    """
+    Members of a bitset, by code point
+    """
+    chars = []
+    while mask:
+        low = mask & -mask
+        chars.append(chr(low.bit_length() - 1))
+        mask ^= low
+    return tuple(chars)
+
+
+ANY_MASK = mask_of(ANY_CHARS)
+
+ATOM_REGEX: typing.Tuple[str, ...] = SET_SPECIAL_CHARS + \
+    tuple(re.escape(x) for x in PRINTABLES)
+ATOM_CHARS: typing.Tuple[typing.Tuple[str, ...], ...] = \
+    tuple(CATEGORY_CHARS[x] for x in SET_SPECIAL_CHARS) + \
+    tuple((x,) for x in PRINTABLES)
+ATOM_MASK: typing.Tuple[int, ...] = tuple(mask_of(x) for x in ATOM_CHARS)
+# position of each atom in the atoms sorted by regex
+# (the order of the atoms written in a set):
+ATOM_RANK: typing.Tuple[int, ...] = tuple(
+    rank for _, rank in sorted(
+        (index, rank) for rank, index in enumerate(
+            sorted(range(len(ATOM_REGEX)), key=ATOM_REGEX.__getitem__))))
+# index of the complementary atom, e.g., \S for \s (-1 if none):
+ATOM_COMPLEMENT: typing.Tuple[int, ...] = tuple(
+    (index ^ 1 if index < len(SET_SPECIAL_CHARS) else -1)
+    for index in range(len(ATOM_REGEX)))
@@ -0,0 +1,112 @@
+"""
+Columnar batch of generated regex
+"""
+import typing
+from array import array
+from .examples import PackedExamples
+
+__all__ = ['RegexBatch']
+
+
+class RegexBatch:
+    """
+    Columns of a batch of results:
+
+    - regex: list of the regex strings
+    - complexity, length: int64 arrays
+    - examples: PackedExamples of the examples of all regex, one after another
+    - example_offsets: int64 array of len(batch) + 1 offsets, where
+        the examples of the i-th regex are examples[offsets[i]:offsets[i + 1]]
+
+    The int columns are `array.array`, which support the buffer protocol,
+    hence NumPy (`numpy.frombuffer`) and Arrow read them without copying.
+    """
+
+    def __init__(self, regex: typing.Optional[typing.List[str]] = None,
+                 complexity: typing.Optional[array] = None,
+                 length: typing.Optional[array] = None,
+                 examples: typing.Optional[PackedExamples] = None,
+                 example_offsets: typing.Optional[array] = None):
+        self.regex: typing.List[str] = [] if regex is None else regex
+        self.complexity = array('q') if complexity is None else complexity
+        self.length = array('q') if length is None else length
+        self.examples = PackedExamples() if examples is None else examples
+        self.example_offsets = array('q', [0]) if example_offsets is None \
+            else example_offsets
+        assert len(self.complexity) == len(self.length) == len(self.regex) \
+            == len(self.example_offsets) - 1, 'columns should have the same length'
+        assert self.example_offsets[-1] == len(self.examples), \
+            'example_offsets should end at len(examples)'
+
+    @classmethod
+    def from_results(cls, results: typing.Iterable[dict]) -> 'RegexBatch':
+        """
+        Batch of results (dicts yielded by RegexGenerator.generate),
+        each field written straight to its column and the examples
+        packed once for the whole batch
+        """
+        regex: typing.List[str] = []
+        complexity = array('q')
+        length = array('q')
+        parts: typing.List[typing.Sequence[str]] = []
+        example_offsets = array('q', [0])
+        count = 0
+        for result in results:
+            regex.append(result['regex'])
+            complexity.append(result['complexity'])
+            length.append(result['length'])
+            parts.append(result['examples'])
+            count += len(result['examples'])
+            example_offsets.append(count)
+        return cls(regex, complexity, length,
+                   PackedExamples.concat(parts), example_offsets)
+
+    def __len__(self) -> int:
+        return len(self.regex)
+
+    def __getitem__(self, index: int) -> dict:
+        """
+        The i-th result, as yielded by RegexGenerator.generate
+        (with its examples as a list)
+        """
+        return {
+            'regex': self.regex[index],
+            'length': self.length[index],
+            'complexity': self.complexity[index],
+            'examples': self.examples[
+                self.example_offsets[index]:self.example_offsets[index + 1]]
+        }
+
+    def to_numpy(self) -> typing.Dict[str, typing.Any]:
+        """
+        The columns as NumPy arrays (requires numpy).
+        The int columns share the memory of this batch.
+        """
+        import numpy
+        return {
+            'regex': numpy.array(self.regex, dtype=object),
+            'complexity': numpy.frombuffer(self.complexity, dtype=numpy.int64),
+            'length': numpy.frombuffer(self.length, dtype=numpy.int64),
+            'examples': numpy.array(list(self.examples), dtype=object),
+            'example_offsets': numpy.frombuffer(self.example_offsets, dtype=numpy.int64)
+        }
+
+    def to_arrow(self):
+        """
+        The batch as a pyarrow Table (requires pyarrow),
+        with the examples as a large_list<string> column
+        sharing the buffers of `examples`
+        """
+        import pyarrow
+
+        def int64s(values: array):
+            # shares the memory of the array
+            return pyarrow.Array.from_buffers(
+                pyarrow.int64(), len(values), [None, pyarrow.py_buffer(values)])
+        return pyarrow.Table.from_arrays([
+            pyarrow.array(self.regex, type=pyarrow.string()),
+            int64s(self.complexity),
+            int64s(self.length),
+            pyarrow.LargeListArray.from_arrays(
+                int64s(self.example_offsets), self.examples.to_arrow())
+        ], names=['regex', 'complexity', 'length', 'examples'])
@@ -0,0 +1,57 @@
+"""
+Bounded LRU cache with hit/miss counters
+"""
+import typing
+from collections import OrderedDict
+
+__all__ = ['LRUCache']
+
+
+class LRUCache:
+    """
+    Least-recently-used cache holding at most `maxsize` items
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        assert isinstance(maxsize, int) and maxsize > 0, 'maxsize should be > 0'
+        self._maxsize = maxsize
+        self._items: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key) -> bool:
+        return key in self._items
+
+    def get_or_create(self, key, create: typing.Callable):
+        """
+        Get the value of `key`,
+        or build it by `create(key)` and cache it
+        """
+        try:
+            value = self._items[key]
+        except KeyError:
+            self.misses += 1
+            value = create(key)
+            self._items[key] = value
+            if len(self._items) > self._maxsize:
+                self._items.popitem(last=False)
+            return value
+        self.hits += 1
+        self._items.move_to_end(key)
+        return value
+
+    def info(self) -> dict:
+        """
+        Snapshot of the cache usage
+        """
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.,
+            'size': len(self._items),
+            'maxsize': self._maxsize
+        }
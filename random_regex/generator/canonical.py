@@ -0,0 +1,208 @@
+"""
+Canonicalization of the generated patterns
+
+The PatternGenerator stacks groups that only capture, e.g., `((\\s))((\\s))`
+or `(((?:(D2[Qh]))?))`. Since the dataset is about fullmatching, the
+capturing groups do not change what a regex matches: they only make the
+regex longer, and make equivalent regex look different to the repeat filter.
+
+`canonicalize` rebuilds a pattern tree matching the same strings where:
+- capturing groups are dropped, and a group is only kept where a
+  quantifier or an alternation needs one: `((\\s))((\\s))` -> `\\s\\s`,
+- nested concatenations and alternations are flattened,
+  and repeated alternatives are dropped,
+- trivial quantifiers are folded: x{1} -> x, x{0} -> '', x{0,1} -> x?,
+  x{2,2} -> x{2}, and repeated empty patterns, e.g., `(()){4,7}`, are removed,
+- positive sets and ranges of printable chars are written with their
+  sorted members, merging runs into ranges: `[ca-b]` -> `[a-c]`, `[a-a]` -> `a`.
+
+NOTE: matching strings repeated by the original pattern, e.g., `(a|a)` or
+`(?:)?`, are only enumerated once by the canonical pattern, so its count
+can be lower.
+"""
+import re
+import typing
+from .cache import LRUCache
+from .engine import (
+    CATEGORY_CHARS,
+    Node,
+    Chars,
+    Concat,
+    Capture,
+    Union,
+    Repeat
+)
+
+__all__ = ['canonicalize', 'Alternation', 'Quantifier']
+
+# chars escaped inside a canonical set
+SET_SPECIAL_CHARS = '\\]-[^&~|'
+
+# canonical Chars by regex (the regex of a Chars determines its members)
+_chars_cache = LRUCache(4096)
+
+
+class Alternation(Union):
+    """
+    Or-ed patterns without wrapping groups: x|y
+    (a group is needed around it within a concatenation)
+    """
+
+    def _render(self, tokens):
+        for i, node in enumerate(self.nodes):
+            if i:
+                tokens.append('|')
+            node.render(tokens)
+
+
+class Quantifier(Repeat):
+    """
+    Repeated pattern in its shortest form: x?, x{lower} or x{lower,upper}
+    """
+
+    def _render(self, tokens):
+        self.node.render(tokens)
+        if self.lower == self.upper:
+            tokens.append(f'{{{self.lower}}}')
+        elif self.lower == 0 and self.upper == 1:
+            tokens.append('?')
+        else:
+            tokens.append(f'{{{self.lower},{self.upper}}}')
+
+
+def canonicalize(node: Node) -> Node:
+    """
+    Canonical pattern matching the same strings as `node`
+    """
+    return _canonicalize(node, {})
+
+
+def _canonicalize(node: Node, memo: typing.Dict[int, Node]) -> Node:
+    """
+    NOTE: the generated trees share subtrees (e.g., a group and its
+    Amount-wrapped version), hence the canonical nodes are memoized by id.
+    """
+    key = id(node)
+    if key in memo:
+        return memo[key]
+    if isinstance(node, Chars):
+        result = _chars_cache.get_or_create(
+            node.regex, lambda _: _canonicalize_chars(node))
+    elif isinstance(node, Capture):
+        result = _canonicalize(node.nodes[0], memo)
+    elif isinstance(node, Concat):
+        result = _canonicalize_concat(node, memo)
+    elif isinstance(node, Union):
+        result = _canonicalize_union(node, memo)
+    elif isinstance(node, Repeat):
+        result = _canonicalize_repeat(node, memo)
+    else:
+        raise TypeError(f'unknown pattern node: {type(node).__name__}')
+    memo[key] = result
+    return result
+
+
+def _is_empty(node: Node) -> bool:
+    """
+    Whether a canonical node only matches the empty string
+    """
+    return type(node) is Concat and not node.nodes
+
+
+def _atom(node: Node) -> Node:
+    """
+    Wrap a canonical node into a group if a quantifier cannot follow it
+    """
+    if isinstance(node, (Chars, Capture)):
+        return node
+    return Capture(node)
+
+
+def _canonicalize_concat(node: Concat, memo: typing.Dict[int, Node]) -> Node:
+    nodes: typing.List[Node] = []
+    for child in node.nodes:
+        child = _canonicalize(child, memo)
+        if type(child) is Concat:
+            nodes.extend(child.nodes)
+        else:
+            nodes.append(child)
+    if len(nodes) == 1:
+        return nodes[0]
+    return Concat([Capture(x) if isinstance(x, Union) else x for x in nodes])
+
+
+def _canonicalize_union(node: Union, memo: typing.Dict[int, Node]) -> Node:
+    nodes: typing.Dict[str, Node] = {}
+    for child in node.nodes:
+        child = _canonicalize(child, memo)
+        for x in (child.nodes if isinstance(child, Union) else (child,)):
+            nodes.setdefault(x.regex, x)
+    if not nodes:
+        return Concat([])
+    elif len(nodes) == 1:
+        return next(iter(nodes.values()))
+    return Alternation(list(nodes.values()))
+
+
+def _canonicalize_repeat(node: Repeat, memo: typing.Dict[int, Node]) -> Node:
+    child = _canonicalize(node.node, memo)
+    if node.upper == 0 or _is_empty(child):
+        return Concat([])
+    elif node.lower == node.upper == 1:
+        return child
+    return Quantifier(_atom(child), node.lower, node.upper)
+
+
+def _canonicalize_chars(node: Chars) -> Chars:
+    """
+    Write a positive set or range by its sorted members.
+    Special chars, negated sets and sets holding special chars are kept
+    as they are, since their members depend on the `.` universe.
+    NOTE: `[0-9]` is not written `\\d`, which also matches the
+    non-ASCII digits (e.g., '\\u0663').
+    """
+    regex = node.regex
+    if regex in CATEGORY_CHARS or regex.startswith('[^') or \
+            (regex.startswith('[') and _has_category(regex)):
+        return node
+    members = sorted(set(node.chars), key=ord)
+    if len(members) == 1:
+        return Chars(re.escape(members[0]), members)
+    elif all(32 <= ord(c) < 127 for c in members):
+        return Chars(f'[{_set_items(members)}]', members)
+    return node
+
+
+def _has_category(regex: str) -> bool:
+    """
+    Whether a set holds a special char: \\s, \\S, \\d, \\D, \\w or \\W
+    """
+    index = regex.find('\\')
+    while index >= 0:
+        if regex[index + 1:index + 2] in ('s', 'S', 'd', 'D', 'w', 'W'):
+            return True
+        index = regex.find('\\', index + 2)
+    return False
+
+
+def _set_items(members: typing.List[str]) -> str:
+    """
+    Members (sorted by code point) merged into ranges
+    when at least three of them are consecutive
+    """
+    items = []
+    start = 0
+    for end in range(1, len(members) + 1):
+        if end < len(members) and ord(members[end]) == ord(members[end - 1]) + 1:
+            continue
+        if end - start >= 3:
+            items.append(f'{_set_escape(members[start])}-'
+                         f'{_set_escape(members[end - 1])}')
+        else:
+            items.extend(_set_escape(c) for c in members[start:end])
+        start = end
+    return ''.join(items)
+
+
+def _set_escape(char: str) -> str:
+    return '\\' + char if char in SET_SPECIAL_CHARS else char
@@ -0,0 +1,163 @@
+"""
+Checkpoints of long generation runs
+
+Since candidate n of the random stream only depends on (seed, n),
+and the pipeline reads no candidate ahead of the result it yields,
+the state of a run at any result boundary is small:
+- the generator parameters,
+- the position of the random stream,
+- the number of emitted results,
+- the repeat filter.
+
+A checkpoint pickles this state into a file, written aside and
+atomically moved over the previous checkpoint, so that a job killed
+at any point resumes from its last complete checkpoint and yields
+exactly the results the interrupted run would have yielded.
+
+The repeat filter is saved according to its kind:
+- MmapDedupStore: not copied, the store is committed instead
+  (see MmapDedupStore.commit), and rolled back to the checkpoint
+  on resume, which keeps the checkpoints incremental,
+- rbloom.Bloom: its bytes, which requires a hash function stable
+  across processes (the default `hash` of str is salted per process):
+  ```bloom_cls=functools.partial(rbloom.Bloom, hash_func=stable_hash)```
+- other filters (pybloom, bloom-filter, ...): pickled.
+
+Usage:
+```python
+checkpoint = Checkpoint('run.ckpt', every=10000)
+if checkpoint.exists():
+    regex_generator = checkpoint.load()
+else:
+    regex_generator = RegexGenerator(seed=0)
+for result in islice(regex_generator.generate(checkpoint=checkpoint),
+                     total - regex_generator.emitted):
+    ...
+```
+"""
+import hashlib
+import os
+import pickle
+import time
+import typing
+from .dedup import MmapDedupStore
+
+__all__ = ['Checkpoint', 'stable_hash']
+
+FORMAT = 1
+
+
+def stable_hash(item: str) -> int:
+    """
+    Signed 128-bit hash of a str, the same in every process
+    (a `hash_func` making rbloom filters restorable)
+    """
+    return int.from_bytes(
+        hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest(),
+        'little', signed=True)
+
+
+def dump_dedup(bloom) -> dict:
+    """
+    Picklable state of a repeat filter
+    """
+    if isinstance(bloom, MmapDedupStore):
+        return {'kind': 'store', 'store': bloom, 'commits': bloom.commits + 1}
+    elif type(bloom).__module__ == 'rbloom':
+        if bloom.hash_func is hash:
+            raise ValueError(
+                'an rbloom filter with the built-in hash cannot be restored, use '
+                'bloom_cls=functools.partial(rbloom.Bloom, hash_func=stable_hash)')
+        return {'kind': 'rbloom', 'data': bloom.save_bytes(),
+                'hash_func': bloom.hash_func}
+    return {'kind': 'object', 'bloom': bloom}
+
+
+def load_dedup(state: dict):
+    """
+    Repeat filter restored from `dump_dedup`
+    """
+    if state['kind'] == 'store':
+        store = state['store']
+        store.rollback(state['commits'])
+        return store
+    elif state['kind'] == 'rbloom':
+        import rbloom
+        return rbloom.Bloom.load_bytes(state['data'], state['hash_func'])
+    return state['bloom']
+
+
+class Checkpoint:
+    """
+    Periodic checkpoints of a RegexGenerator into a file
+
+    Args:
+        - path: file of the checkpoint
+        - every: number of emitted results between two checkpoints
+        - seconds: also checkpoint after this many seconds
+            since the last one (None: only count the results)
+        - on_save: called before each checkpoint, e.g., to flush
+            the results consumed so far into their storage
+    """
+
+    def __init__(self, path: str, every: int = 10000,
+                 seconds: typing.Optional[float] = None,
+                 on_save: typing.Optional[typing.Callable[[], None]] = None):
+        assert isinstance(every, int) and every > 0, 'every should be > 0'
+        assert seconds is None or seconds > 0, 'seconds should be > 0'
+        self.path = path
+        self._every = every
+        self._seconds = seconds
+        self._on_save = on_save
+        self.saves = 0
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def save(self, regex_generator) -> None:
+        """
+        Checkpoint the generator (between two results)
+        """
+        if self._on_save is not None:
+            self._on_save()
+        state = dict(regex_generator.state_dict(),
+                     format=FORMAT, time=time.time())
+        path = self.path + '.tmp'
+        with open(path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path, self.path)
+        # once the checkpoint is in place (see MmapDedupStore.rollback):
+        if state['dedup']['kind'] == 'store':
+            state['dedup']['store'].commit()
+        self.saves += 1
+
+    def load(self):
+        """
+        The generator as of the checkpoint
+        """
+        from .generator import RegexGenerator
+        with open(self.path, 'rb') as f:
+            state = pickle.load(f)
+        assert state.get('format') == FORMAT, \
+            f'{self.path} is not a checkpoint of this version'
+        return RegexGenerator.from_state_dict(state)
+
+    def track(self, regex_generator, results: typing.Iterator[dict]) \
+            -> typing.Iterator[dict]:
+        """
+        Pass the results of the generator through, checkpointing it
+        when the consumer asks for the next result after
+        `every` results (or `seconds`) since the last checkpoint
+        """
+        saved = regex_generator.emitted
+        last = time.monotonic()
+        for result in results:
+            yield result
+            if regex_generator.emitted - saved >= self._every or (
+                    self._seconds is not None and
+                    time.monotonic() - last >= self._seconds):
+                self.save(regex_generator)
+                saved = regex_generator.emitted
+                last = time.monotonic()
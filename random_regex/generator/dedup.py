@@ -0,0 +1,456 @@
+"""
+Persistent, memory-mapped de-duplication store,
+and its shared memory version for concurrent processes
+
+The store keeps a fixed-size fingerprint (blake2b digest) of each
+regex in an open-addressing hash table (linear probing) of a
+memory-mapped file, so that:
+- it persists across runs (the same file is extended by later jobs),
+- the memory usage is the page cache of the file, not the Python heap,
+- any number of processes can open it read-only (mode='r'),
+  next to a single writer,
+- it can be rolled back to its last commit (see `commit`), so that a
+  job resumed from a checkpoint, or restarted after a crash, does not
+  see the items it added after it without persisting their results.
+
+Unlike a bloom filter, the lookups are exact up to fingerprint collisions,
+whose probability is tuned by `error_rate` (see MmapDedupStore).
+
+File layout (little-endian):
+    magic (8 bytes) | fingerprint_bytes (u32) | commits (u32) |
+    capacity (u64) | count (u64) | capacity slots of fingerprint_bytes
+An all-zero slot is empty.
+
+Once a store is committed (or rolled back), the fingerprints added since
+the last commit are also appended to a journal file (`path + '.journal'`),
+which is emptied by each commit: commit once the results of the added
+items are durably written. A store never committed does not journal,
+its items are permanent as soon as added.
+
+SharedDedupFilter keeps the same table in a shared memory segment instead,
+so that independent processes of a host check and add regex in the same
+filter without sending them to each other (see SharedDedupFilter).
+"""
+import contextlib
+import functools
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+import typing
+
+__all__ = ['MmapDedupStore', 'SharedDedupFilter']
+
+MAGIC = b'RRDEDUP1'
+HEADER = struct.Struct('<8sIIQQ')
+MAX_LOAD = 0.5
+# load of a shared table (which cannot grow) beyond which it refuses items
+MAX_SHARED_LOAD = 0.9
+
+
+class _FingerprintTable:
+    """
+    Open-addressing table (linear probing) of the fingerprints of the
+    items, in a buffer (`_buffer`) with the HEADER layout
+    """
+    _buffer: typing.Any
+    _fingerprint_bytes: int
+    _capacity: int
+    _empty: bytes
+
+    def __len__(self) -> int:
+        return HEADER.unpack_from(self._buffer)[4]
+
+    def __contains__(self, item: str) -> bool:
+        return self._find(self._fingerprint(item))[0]
+
+    def _fingerprint(self, item: str) -> bytes:
+        fingerprint = hashlib.blake2b(
+            item.encode('utf-8'), digest_size=self._fingerprint_bytes).digest()
+        if fingerprint == self._empty:
+            return b'\x01' * self._fingerprint_bytes
+        return fingerprint
+
+    def _find(self, fingerprint: bytes) -> typing.Tuple[bool, int]:
+        """
+        Whether the fingerprint is stored, and the offset
+        of its slot (or of the empty slot to store it)
+        """
+        mask = self._capacity - 1
+        size = self._fingerprint_bytes
+        index = int.from_bytes(fingerprint, 'little') & mask
+        while True:
+            offset = HEADER.size + index * size
+            slot = self._buffer[offset:offset + size]
+            if slot == fingerprint:
+                return True, offset
+            if slot == self._empty:
+                return False, offset
+            index = (index + 1) & mask
+
+    def _insert(self, fingerprint: bytes, offset: int) -> int:
+        """
+        Store a fingerprint into its empty slot, return the item count
+        """
+        self._buffer[offset:offset + self._fingerprint_bytes] = fingerprint
+        count = len(self) + 1
+        struct.pack_into('<Q', self._buffer, HEADER.size - 8, count)
+        return count
+
+    def _remove(self, fingerprint: bytes) -> None:
+        """
+        Delete a fingerprint, shifting back the following slots of its
+        probe sequence into the hole (no tombstones with linear probing)
+        """
+        found, offset = self._find(fingerprint)
+        if not found:
+            return
+        mask = self._capacity - 1
+        size = self._fingerprint_bytes
+        hole = (offset - HEADER.size) // size
+        index = hole
+        while True:
+            index = (index + 1) & mask
+            start = HEADER.size + index * size
+            slot = self._buffer[start:start + size]
+            if slot == self._empty:
+                break
+            home = int.from_bytes(slot, 'little') & mask
+            # the slot can fill the hole unless its home lies in (hole, index]:
+            if (index - home) & mask >= (index - hole) & mask:
+                hole_start = HEADER.size + hole * size
+                self._buffer[hole_start:hole_start + size] = slot
+                hole = index
+        hole_start = HEADER.size + hole * size
+        self._buffer[hole_start:hole_start + size] = self._empty
+        struct.pack_into('<Q', self._buffer, HEADER.size - 8, len(self) - 1)
+
+
+class MmapDedupStore(_FingerprintTable):
+    """
+    Exact (up to fingerprint collisions) set of regex in a memory-mapped file,
+    with the `in`/`add` interface of the bloom filters
+
+    Plug it into RegexGenerator with a path:
+    ```bloom_cls=functools.partial(MmapDedupStore, path='seen.dedup')```
+
+    Args:
+        - capacity: expected item count (the table doubles when half full)
+        - error_rate: upper bound of the false positive rate at `capacity`
+            items, which sets the fingerprint size (8 to 16 bytes).
+            0 means 16-byte fingerprints.
+            When the file exists, its fingerprint size is kept.
+        - path: file of the store (created if missing)
+        - mode: 'a' to read and add, 'r' to only read
+    """
+
+    def __init__(self, capacity: int = 1000000, error_rate: float = 0.,
+                 path: typing.Optional[str] = None, mode: str = 'a'):
+        assert path is not None, 'path is required, e.g., ' \
+            'bloom_cls=functools.partial(MmapDedupStore, path=...)'
+        assert mode in ('a', 'r'), 'mode should be "a" or "r"'
+        assert capacity > 0, 'capacity should be > 0'
+        assert 0. <= error_rate < 1., 'error_rate should be in range [0, 1)'
+        self._capacity_hint = capacity
+        self._error_rate = error_rate
+        self.path = path
+        self.mode = mode
+        self._journal: typing.Optional[int] = None
+        if not os.path.exists(path):
+            assert mode == 'a', f'{path} does not exist'
+            self._create(path, _fingerprint_bytes(capacity, error_rate),
+                         _table_size(capacity))
+        self._open()
+
+    def __reduce__(self):
+        return (MmapDedupStore,
+                (self._capacity_hint, self._error_rate, self.path, self.mode))
+
+    @property
+    def commits(self) -> int:
+        """
+        Number of commits of the store
+        """
+        return HEADER.unpack_from(self._buffer)[2]
+
+    def add(self, item: str) -> bool:
+        """
+        Add an item, return whether it was already in the store
+        """
+        assert self.mode == 'a', 'the store is opened read-only'
+        fingerprint = self._fingerprint(item)
+        found, offset = self._find(fingerprint)
+        if found:
+            return True
+        if self._journal is not None:
+            # journaled first, so that no added item escapes a rollback:
+            os.write(self._journal, fingerprint)
+        if self._insert(fingerprint, offset) > self._capacity * MAX_LOAD:
+            self._grow()
+        return False
+
+    def commit(self) -> int:
+        """
+        Make the items added so far permanent (once their results are
+        durably written), and start journaling the next ones.
+        Return the number of commits of the store.
+        """
+        assert self.mode == 'a', 'the store is opened read-only'
+        self._buffer.flush()
+        os.ftruncate(self._open_journal(), 0)
+        # counted once the journal is empty: a crash in between leaves
+        # the previous count, with nothing to roll back
+        commits = self.commits + 1
+        struct.pack_into('<I', self._buffer, 12, commits)
+        self._buffer.flush()
+        return commits
+
+    def rollback(self, commits: int) -> None:
+        """
+        Restore the store as of its `commits`-th commit, removing the items
+        added after it (when called at the next commit count, e.g., when the
+        process stopped between a checkpoint and the commit, it commits),
+        and start journaling the next ones
+        """
+        assert self.mode == 'a', 'the store is opened read-only'
+        if self.commits == commits - 1:
+            self.commit()
+            return
+        assert self.commits == commits, \
+            f'{self.path} is at commit {self.commits}, not {commits}'
+        journal_fd = self._open_journal()
+        size = self._fingerprint_bytes
+        with open(self.path + '.journal', 'rb') as f:
+            for fingerprint in iter(functools.partial(f.read, size), b''):
+                # a partly written last fingerprint is ignored:
+                if len(fingerprint) == size:
+                    self._remove(fingerprint)
+        os.ftruncate(journal_fd, 0)
+        self._buffer.flush()
+
+    def refresh(self) -> None:
+        """
+        Re-open the file, e.g., to see the table of a writer that grew it
+        (the items added in place are visible without refreshing)
+        """
+        self.flush()
+        self._buffer.close()
+        self._open()
+
+    def flush(self) -> None:
+        if self.mode == 'a':
+            self._buffer.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self._buffer.close()
+        if self._journal is not None:
+            os.close(self._journal)
+            self._journal = None
+
+    def _open_journal(self) -> int:
+        """
+        The file descriptor of the journal, opened on first use
+        """
+        if self._journal is None:
+            self._journal = os.open(self.path + '.journal',
+                                    os.O_WRONLY | os.O_CREAT | os.O_APPEND)
+        return self._journal
+
+    def _open(self) -> None:
+        with open(self.path, 'r+b' if self.mode == 'a' else 'rb') as f:
+            self._buffer = mmap.mmap(
+                f.fileno(), 0,
+                access=mmap.ACCESS_WRITE if self.mode == 'a' else mmap.ACCESS_READ)
+        magic, self._fingerprint_bytes, _, self._capacity, _ = \
+            HEADER.unpack_from(self._buffer)
+        assert magic == MAGIC, f'{self.path} is not a dedup store'
+        self._empty = bytes(self._fingerprint_bytes)
+
+    @staticmethod
+    def _create(path: str, fingerprint_bytes: int, capacity: int,
+                commits: int = 0) -> None:
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, fingerprint_bytes, commits, capacity, 0))
+            f.truncate(HEADER.size + capacity * fingerprint_bytes)
+
+    def _grow(self) -> None:
+        """
+        Re-hash into a table twice as large, written aside
+        and atomically moved over the file
+        """
+        size = self._fingerprint_bytes
+        old = self._buffer
+        count = len(self)
+        path = self.path + '.tmp'
+        self._create(path, size, self._capacity * 2, self.commits)
+        with open(path, 'r+b') as f:
+            self._buffer = mmap.mmap(f.fileno(), 0)
+        self._capacity *= 2
+        for start in range(HEADER.size, len(old), size):
+            fingerprint = old[start:start + size]
+            if fingerprint != self._empty:
+                offset = self._find(fingerprint)[1]
+                self._buffer[offset:offset + size] = fingerprint
+        struct.pack_into('<Q', self._buffer, HEADER.size - 8, count)
+        self._buffer.flush()
+        old.close()
+        os.replace(path, self.path)
+
+
+class SharedDedupFilter(_FingerprintTable):
+    """
+    Exact (up to fingerprint collisions) set of regex in a shared memory
+    segment, with the `in`/`add` interface of the bloom filters,
+    used at once by any number of processes of a host (POSIX only)
+
+    Every process plugs it into its RegexGenerator with the same name:
+    ```bloom_cls=functools.partial(SharedDedupFilter, name='regex-dedup')```
+    The first one creates the segment, the next ones attach to it.
+
+    The lookups read the segment without locking. An `add` checks and
+    stores the fingerprint under an exclusive lock of a file (a few
+    microseconds), hence two processes never both add the same regex:
+    the second `add` returns True and the repeat filter drops its result.
+
+    The segment stays until `unlink` (like a file), whichever
+    process created it.
+
+    Args:
+        - capacity: expected item count. The table cannot grow,
+            `add` raises a RuntimeError beyond 1.8 times `capacity`.
+        - error_rate: upper bound of the false positive rate at `capacity`
+            items, which sets the fingerprint size (8 to 16 bytes).
+            0 means 16-byte fingerprints.
+            When the segment exists, its size and fingerprint size are kept.
+        - name: name of the shared memory segment
+        - lock_path: lock file of the `add` calls
+            (default: `name + '.lock'` in the temporary directory)
+    """
+
+    def __init__(self, capacity: int = 1000000, error_rate: float = 0.,
+                 name: typing.Optional[str] = None,
+                 lock_path: typing.Optional[str] = None):
+        import fcntl
+        from multiprocessing import shared_memory
+        assert name is not None, 'name is required, e.g., ' \
+            'bloom_cls=functools.partial(SharedDedupFilter, name=...)'
+        assert capacity > 0, 'capacity should be > 0'
+        assert 0. <= error_rate < 1., 'error_rate should be in range [0, 1)'
+        self._capacity_hint = capacity
+        self._error_rate = error_rate
+        self.name = name
+        self.lock_path = lock_path or os.path.join(
+            tempfile.gettempdir(), f'{name}.lock')
+        self._fcntl = fcntl
+        self._lock = os.open(self.lock_path, os.O_RDWR | os.O_CREAT)
+        with self._locked():
+            try:
+                self._shm = shared_memory.SharedMemory(name=name)
+            except FileNotFoundError:
+                fingerprint_bytes = _fingerprint_bytes(capacity, error_rate)
+                table_size = _table_size(capacity)
+                self._shm = shared_memory.SharedMemory(
+                    name=name, create=True,
+                    size=HEADER.size + table_size * fingerprint_bytes)
+                assert self._shm.buf is not None, 'the segment should be attached'
+                HEADER.pack_into(self._shm.buf, 0, MAGIC, fingerprint_bytes,
+                                 0, table_size, 0)
+        _untrack(self._shm)
+        self._buffer = self._shm.buf
+        magic, self._fingerprint_bytes, _, self._capacity, _ = \
+            HEADER.unpack_from(self._buffer)
+        assert magic == MAGIC, f'{name} is not a dedup filter'
+        self._empty = bytes(self._fingerprint_bytes)
+
+    def __reduce__(self):
+        return (SharedDedupFilter, (self._capacity_hint, self._error_rate,
+                                    self.name, self.lock_path))
+
+    def add(self, item: str) -> bool:
+        """
+        Add an item, return whether it was already in the filter
+        (possibly added by another process since a lookup)
+        """
+        fingerprint = self._fingerprint(item)
+        fcntl = self._fcntl
+        fcntl.flock(self._lock, fcntl.LOCK_EX)
+        try:
+            found, offset = self._find(fingerprint)
+            if found:
+                return True
+            if len(self) + 1 > self._capacity * MAX_SHARED_LOAD:
+                raise RuntimeError(f'the dedup filter {self.name} is full')
+            self._insert(fingerprint, offset)
+            return False
+        finally:
+            fcntl.flock(self._lock, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        """
+        Detach this process from the segment
+        """
+        self._buffer = None
+        self._shm.close()
+        os.close(self._lock)
+
+    def unlink(self) -> None:
+        """
+        Destroy the segment (once all processes are done with it)
+        """
+        from multiprocessing import resource_tracker
+        # tracked again, since SharedMemory.unlink un-tracks it:
+        resource_tracker.register(_tracked_name(self._shm), 'shared_memory')
+        self._shm.unlink()
+        try:
+            os.remove(self.lock_path)
+        except FileNotFoundError:
+            pass
+
+    @contextlib.contextmanager
+    def _locked(self) -> typing.Iterator[None]:
+        self._fcntl.flock(self._lock, self._fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            self._fcntl.flock(self._lock, self._fcntl.LOCK_UN)
+
+
+def _untrack(shm) -> None:
+    """
+    Keep the segment after this process exits: the resource tracker
+    would unlink it, even if attached to only (before Python 3.13)
+    """
+    from multiprocessing import resource_tracker
+    try:
+        resource_tracker.unregister(_tracked_name(shm), 'shared_memory')
+    except Exception:
+        pass
+
+
+def _tracked_name(shm) -> str:
+    """
+    Name of a segment in the resource tracker, with the leading '/'
+    of the POSIX names (stripped from the public `name`)
+    """
+    return '/' + shm.name if os.name == 'posix' else shm.name
+
+
+def _fingerprint_bytes(capacity: int, error_rate: float) -> int:
+    """
+    Fingerprint size such that `capacity` stored items give
+    a false positive rate of at most `error_rate` per lookup
+    """
+    if error_rate == 0.:
+        return 16
+    bits = math.log2(capacity / error_rate)
+    return min(max(math.ceil(bits / 8), 8), 16)
+
+
+def _table_size(capacity: int) -> int:
+    """
+    Power of 2 number of slots keeping the load under MAX_LOAD
+    """
+    return max(1 << math.ceil(math.log2(capacity / MAX_LOAD)), 1024)
@@ -0,0 +1,384 @@
+"""
+Native counting and enumeration engine
+
+The patterns built by PatternGenerator are Node objects:
+RegexPattern that keep the structure they are built from.
+Hence, the matching strings can be counted, enumerated and sampled
+directly from the tree, without re-parsing the regex string.
+
+The matching strings are also indexed in their enumeration order:
+`unrank(i)` builds the i-th one directly from the counts of the subtrees,
+which allows uniform sampling (`sample_uniform`) without enumerating.
+
+The `regex` of a Node is rendered lazily, by writing the tokens of the
+whole tree into one list. It is identical to the regex of the equivalent
+regexfactory pattern, which is only built on request (`to_pattern`).
+
+The character universe follows exrex:
+- `.` matches chr(32) ~ chr(122)
+- \\w and \\W are taken from chr(0) ~ chr(255)
+- negated sets, \\S and \\D are complements within the `.` characters
+"""
+import itertools
+import random
+import re
+import string
+import typing
+from regexfactory.pattern import RegexPattern, join
+from regexfactory import patterns
+
+__all__ = ['Node', 'Chars', 'Concat', 'Capture', 'Union', 'Repeat', 'Optional']
+
+ANY_CHARS: typing.Tuple[str, ...] = tuple(chr(x) for x in range(32, 123))
+SPACE_CHARS: typing.Tuple[str, ...] = tuple(sorted(' \t\n\r\v\f'))
+DIGIT_CHARS: typing.Tuple[str, ...] = tuple(string.digits)
+WORD_CHARS: typing.Tuple[str, ...] = tuple(
+    chr(x) for x in range(256) if re.match(r'\w', chr(x)))
+NOTWORD_CHARS: typing.Tuple[str, ...] = tuple(
+    chr(x) for x in range(256) if not re.match(r'\w', chr(x)))
+
+CATEGORY_CHARS: typing.Dict[str, typing.Tuple[str, ...]] = {
+    '.': ANY_CHARS,
+    '\\s': SPACE_CHARS,
+    '\\S': tuple(c for c in ANY_CHARS if c not in SPACE_CHARS),
+    '\\d': DIGIT_CHARS,
+    '\\D': tuple(c for c in ANY_CHARS if c not in DIGIT_CHARS),
+    '\\w': WORD_CHARS,
+    '\\W': NOTWORD_CHARS,
+}
+
+
+def _saturate(value: int, cap: typing.Optional[int]) -> int:
+    if cap is None or value < cap:
+        return value
+    return cap
+
+
+def _expand(node: 'Node', memo: typing.Any) -> typing.Iterable[str]:
+    return node.expand() if memo is None else memo.expand(node)
+
+
+class Node(RegexPattern):
+    """
+    RegexPattern keeping the structure it is built from
+    """
+    _regex: typing.Optional[str] = None
+    _size: typing.Optional[int] = None
+    # matching strings, set by a SubpatternMemo:
+    _strings: typing.Optional[typing.Tuple[str, ...]] = None
+
+    @property  # type: ignore
+    def regex(self) -> str:  # type: ignore
+        if self._regex is None:
+            tokens: typing.List[str] = []
+            self.render(tokens)
+            self._regex = ''.join(tokens)
+        return self._regex
+
+    @regex.setter
+    def regex(self, value: str) -> None:
+        self._regex = value
+
+    def render(self, tokens: typing.List[str]) -> None:
+        """
+        Append the regex tokens of this pattern to `tokens`
+        """
+        if self._regex is None:
+            self._render(tokens)
+        else:
+            tokens.append(self._regex)
+
+    def _render(self, tokens: typing.List[str]) -> None:
+        raise NotImplementedError
+
+    def to_pattern(self) -> RegexPattern:
+        """
+        Build the equivalent regexfactory pattern
+        """
+        raise NotImplementedError
+
+    def count(self, cap: typing.Optional[int] = None) -> int:
+        """
+        Count the matching strings.
+        With `cap`, the counting saturates at `cap`
+        (i.e., min(count, cap) is returned).
+        """
+        raise NotImplementedError
+
+    def size(self) -> int:
+        """
+        Exact count of the matching strings (cached)
+        """
+        if self._size is None:
+            self._size = self.count()
+        return self._size
+
+    def unrank(self, index: int) -> str:
+        """
+        The `index`-th matching string in the order of `expand`
+        """
+        raise NotImplementedError
+
+    def sample_uniform(self, k: int, rng: typing.Any = random,
+                       retries: typing.Optional[int] = None) -> typing.List[str]:
+        """
+        Draw up to `k` distinct matching strings, uniformly over
+        the enumeration, by unranking distinct random indices.
+        The drawing stops after `retries` draws giving no new string
+        (default: 7 * k, i.e., at most 8 * k draws).
+        If the pattern matches at most `k` strings, all of them are
+        enumerated (in the order of `expand`, without the repeated ones).
+        NOTE: `size` counts the enumeration, with its repeated strings
+        (e.g., `a|a`), hence fewer than `min(k, size)` strings are
+        returned when the pattern has fewer distinct strings.
+        """
+        return list(self.iter_sample_uniform(k, rng, retries))
+
+    def iter_sample_uniform(self, k: int, rng: typing.Any = random,
+                            retries: typing.Optional[int] = None) -> typing.Iterator[str]:
+        """
+        Lazy version of `sample_uniform`, yielding the strings as drawn
+        """
+        size = self.size()
+        if size <= k:
+            yield from dict.fromkeys(self.expand())
+            return
+        retries = 7 * k if retries is None else retries
+        indices: typing.Set[int] = set()
+        drawn: typing.Set[str] = set()
+        while len(drawn) < k:
+            index = rng.randrange(size)
+            if index not in indices:
+                indices.add(index)
+                example = self.unrank(index)
+                if example not in drawn:
+                    drawn.add(example)
+                    yield example
+                    continue
+            if retries == 0:
+                return
+            retries -= 1
+
+    def expand(self, memo: typing.Any = None) -> typing.Iterator[str]:
+        """
+        Enumerate all matching strings.
+        With `memo` (a SubpatternMemo), the matching strings of
+        the sub-patterns are looked up in it.
+        """
+        raise NotImplementedError
+
+    def sample(self, rng: typing.Any = random) -> str:
+        """
+        Draw one random matching string
+        """
+        raise NotImplementedError
+
+
+class Chars(Node):
+    """
+    Single character pattern: a literal, a special char, Range, Set or NotSet
+    """
+
+    def __init__(self, regex: str, chars: typing.Sequence[str]) -> None:
+        self._regex = regex
+        self.chars = tuple(chars)
+
+    def to_pattern(self):
+        return RegexPattern(self.regex)
+
+    def count(self, cap=None):
+        return _saturate(len(self.chars), cap)
+
+    def unrank(self, index):
+        return self.chars[index]
+
+    def expand(self, memo=None):
+        return iter(self.chars)
+
+    def sample(self, rng=random):
+        return rng.choice(self.chars)
+
+
+class Concat(Node):
+    """
+    Concatenation of patterns
+    """
+
+    def __init__(self, nodes: typing.Sequence[Node]) -> None:
+        self.nodes = tuple(nodes)
+
+    def _render(self, tokens):
+        for node in self.nodes:
+            node.render(tokens)
+
+    def to_pattern(self):
+        return join(*(node.to_pattern() for node in self.nodes))
+
+    def count(self, cap=None):
+        result = 1
+        for node in self.nodes:
+            result = _saturate(result * node.count(cap), cap)
+        return result
+
+    def unrank(self, index):
+        # itertools.product order: the last node varies the fastest
+        parts = []
+        for node in reversed(self.nodes):
+            index, rank = divmod(index, node.size())
+            parts.append(node.unrank(rank))
+        return ''.join(reversed(parts))
+
+    def expand(self, memo=None):
+        if len(self.nodes) == 1:
+            return iter(_expand(self.nodes[0], memo))
+        return map(''.join, itertools.product(
+            *(_expand(node, memo) for node in self.nodes)))
+
+    def sample(self, rng=random):
+        return ''.join(node.sample(rng) for node in self.nodes)
+
+
+class Capture(Concat):
+    """
+    Capturing group of a pattern: (x)
+    """
+
+    def __init__(self, node: Node) -> None:
+        self.nodes = (node,)
+
+    def _render(self, tokens):
+        tokens.append('(')
+        self.nodes[0].render(tokens)
+        tokens.append(')')
+
+    def to_pattern(self):
+        return patterns.Group(self.nodes[0].to_pattern())
+
+
+class Union(Node):
+    """
+    Or-ed patterns: (?:x)|(?:y).
+    Without any pattern, it matches the empty string.
+    """
+
+    def __init__(self, nodes: typing.Sequence[Node]) -> None:
+        self.nodes = tuple(nodes)
+
+    def _render(self, tokens):
+        for i, node in enumerate(self.nodes):
+            tokens.append('|(?:' if i else '(?:')
+            node.render(tokens)
+            tokens.append(')')
+
+    def to_pattern(self):
+        return patterns.Or(*(node.to_pattern() for node in self.nodes))
+
+    def count(self, cap=None):
+        if not self.nodes:
+            return 1
+        result = 0
+        for node in self.nodes:
+            result = _saturate(result + node.count(cap), cap)
+        return result
+
+    def unrank(self, index):
+        if not self.nodes:
+            return ''
+        for node in self.nodes:
+            size = node.size()
+            if index < size:
+                return node.unrank(index)
+            index -= size
+        raise IndexError(index)
+
+    def expand(self, memo=None):
+        if not self.nodes:
+            return iter([''])
+        return itertools.chain.from_iterable(
+            _expand(node, memo) for node in self.nodes)
+
+    def sample(self, rng=random):
+        if not self.nodes:
+            return ''
+        # the branches matching nothing (e.g., an empty NotSet) are skipped:
+        return rng.choice([node for node in self.nodes if node.size()]).sample(rng)
+
+
+class Repeat(Node):
+    """
+    Pattern repeated from `lower` to `upper` times: x{lower} or x{lower,upper}.
+    With `fixed`, `upper` equals `lower` and the x{lower} form is used.
+    """
+
+    def __init__(self, node: Node, lower: int, upper: int,
+                 fixed: bool = False) -> None:
+        self.node = node
+        self.lower = lower
+        self.upper = upper
+        self.fixed = fixed
+
+    def _render(self, tokens):
+        self.node.render(tokens)
+        if self.fixed:
+            tokens.append(f'{{{self.lower}}}')
+        else:
+            tokens.append(f'{{{self.lower},{self.upper}}}')
+
+    def to_pattern(self):
+        return patterns.Amount(self.node.to_pattern(), self.lower,
+                               j=None if self.fixed else self.upper)
+
+    def count(self, cap=None):
+        base = self.node.count(cap) if self.upper > 0 else 0
+        result = 0
+        for times in range(self.lower, self.upper + 1):
+            result = _saturate(result + _saturate(base ** times, cap), cap)
+            if result == cap:
+                break
+        return result
+
+    def unrank(self, index):
+        if self.upper == 0:
+            return ''
+        base = self.node.size()
+        for times in range(self.lower, self.upper + 1):
+            block = base ** times
+            if index < block:
+                parts = []
+                for _ in range(times):
+                    index, rank = divmod(index, base)
+                    parts.append(self.node.unrank(rank))
+                return ''.join(reversed(parts))
+            index -= block
+        raise IndexError(index)
+
+    def expand(self, memo=None):
+        if self.upper == 0:
+            return iter([''])
+        items = list(_expand(self.node, memo))
+        return itertools.chain.from_iterable(
+            map(''.join, itertools.product(items, repeat=times))
+            for times in range(self.lower, self.upper + 1))
+
+    def sample(self, rng=random):
+        # a pattern matching nothing is only matched 0 times:
+        upper = self.upper if self.node.size() else 0
+        return ''.join(self.node.sample(rng) for _ in range(
+            rng.randint(self.lower, upper)))
+
+
+class Optional(Repeat):
+    """
+    Pattern matched zero or one time: (?:x)?
+    """
+
+    def __init__(self, node: Node) -> None:
+        super().__init__(node, 0, 1)
+
+    def _render(self, tokens):
+        tokens.append('(?:')
+        self.node.render(tokens)
+        tokens.append(')?')
+
+    def to_pattern(self):
+        return patterns.Optional(self.node.to_pattern())
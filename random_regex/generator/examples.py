@@ -0,0 +1,142 @@
+"""
+Compact container of the examples of a regex
+
+A list of examples holds one str object per example (about 50 bytes of
+overhead each), pickled one by one. PackedExamples holds them as one
+UTF-8 buffer and an int64 array of len + 1 byte offsets, where the i-th
+example is `data[offsets[i]:offsets[i + 1]]`: two objects whatever the
+number of examples, pickled as two buffers, and handed to Arrow as the
+buffers of a large_string array without copying.
+"""
+import typing
+from array import array
+from itertools import accumulate, islice, repeat
+
+__all__ = ['PackedExamples']
+
+
+class PackedExamples(typing.Sequence[str]):
+    """
+    Read-only sequence of examples packed into one UTF-8 buffer
+
+    Args:
+        - data: the UTF-8 encoded examples, one after another
+        - offsets: int64 array of the len + 1 byte offsets of the examples
+    """
+
+    def __init__(self, data: bytes = b'', offsets: typing.Optional[array] = None):
+        self.data = data
+        self.offsets = array('q', [0]) if offsets is None else offsets
+        assert self.offsets[-1] == len(data), 'offsets should end at len(data)'
+
+    @classmethod
+    def pack(cls, examples: typing.Sequence[str]) -> 'PackedExamples':
+        """
+        Pack a sequence of str
+        """
+        text = ''.join(examples)
+        data = text.encode('utf-8')
+        if len(data) == len(text):
+            # ASCII: the byte offsets are the char offsets
+            lengths = map(len, examples)
+        else:
+            lengths = map(len, map(str.encode, examples))
+        return cls(data, array('q', accumulate(lengths, initial=0)))
+
+    @classmethod
+    def concat(cls, parts: typing.Iterable[typing.Sequence[str]]) -> 'PackedExamples':
+        """
+        Pack the examples of several sequences, one after another
+        (the PackedExamples ones are copied buffer-wise, not decoded)
+        """
+        data = bytearray()
+        offsets = array('q', [0])
+        pending: typing.List[str] = []
+
+        def append(packed: PackedExamples) -> None:
+            base = len(data)
+            data.extend(packed.data)
+            offsets.extend(base + x for x in islice(packed.offsets, 1, None))
+
+        for part in parts:
+            if isinstance(part, PackedExamples):
+                if pending:
+                    append(cls.pack(pending))
+                    pending = []
+                append(part)
+            else:
+                # the consecutive str are packed at once:
+                pending.extend(part)
+        if len(offsets) == 1:
+            # a single pack of str, nothing to copy:
+            return cls.pack(pending)
+        if pending:
+            append(cls.pack(pending))
+        return cls(bytes(data), offsets)
+
+    @property
+    def text(self) -> typing.Optional[str]:
+        """
+        The decoded buffer if it is ASCII, whose char offsets
+        are the byte offsets (None otherwise)
+        """
+        text = self.data.decode('utf-8')
+        return text if len(text) == len(self.data) else None
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.data[self.offsets[index]:self.offsets[index + 1]].decode('utf-8')
+
+    def __iter__(self) -> typing.Iterator[str]:
+        text = self.text
+        if text is None:
+            return (self[i] for i in range(len(self)))
+        offsets = self.offsets
+        return (text[offsets[i]:offsets[i + 1]] for i in range(len(self)))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, PackedExamples):
+            return self.data == other.data and self.offsets == other.offsets
+        if isinstance(other, typing.Sequence) and not isinstance(other, str):
+            return len(self) == len(other) and all(
+                a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f'PackedExamples({list(self)!r})'
+
+    def __reduce__(self):
+        return PackedExamples, (self.data, self.offsets)
+
+    def all_fullmatch(self, compiled: typing.Pattern) -> bool:
+        """
+        Whether all examples fullmatch a compiled regex
+
+        NOTE: an ASCII buffer is matched in place, between the offsets
+        (`fullmatch(text, pos, endpos)`), without a str per example.
+        It requires the regex not to look behind its start (no `^`, `\\b`
+        or lookbehind), which holds for the generated regex.
+        """
+        text = self.text
+        if text is None:
+            return all(compiled.fullmatch(example) is not None for example in self)
+        offsets = self.offsets
+        return all(map(compiled.fullmatch, repeat(text, len(self)),
+                       offsets, islice(offsets, 1, None)))
+
+    def to_arrow(self):
+        """
+        The examples as a pyarrow large_string array (requires pyarrow),
+        sharing the memory of this container
+        """
+        import pyarrow
+        return pyarrow.LargeStringArray.from_buffers(
+            len(self), pyarrow.py_buffer(self.offsets), pyarrow.py_buffer(self.data))
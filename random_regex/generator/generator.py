@@ -8,16 +8,32 @@ TODO:
 - [X] use cuckoo filter to ignore repeat regex
 - [X] generate multiple examples with length > 0
 - [ ] add selection weight to different kind of special character
-- [ ] speed up the generation using multi-processing
+- [X] speed up the generation using multi-processing
 
 REF:
 https://regex-generator.olafneumann.org/
 """
-import exrex
 import re
+import time
+import typing
+from itertools import islice
 from toolz import curried
 from toolz.functoolz import pipe
 from .random_pattern import PatternGenerator
+from .parallel import ParallelProducer
+from .cache import LRUCache
+from .rng import StreamRandom
+from .stats import GenerationStats
+from .tuning import AdaptiveTuner
+from .canonical import canonicalize
+from .aio import aiterate
+from .batch import RegexBatch
+from .checkpoint import dump_dedup, load_dedup
+from .memo import SubpatternMemo
+from .examples import PackedExamples
+
+# examples of a candidate going beyond its limits (see RegexGenerator):
+OVER_LIMITS = object()
 
 
 class RegexGenerator:
@@ -27,17 +43,201 @@ class RegexGenerator:
     """
 
     def __init__(self, max_complexity=1000, max_length=20,
-                 item_count=100, bloom_fpr=0.001, bloom_cls=None):
+                 item_count=100, bloom_fpr=0.001, bloom_cls=None,
+                 regex_cache_size=1024, seed=None, rng=None, stats=True,
+                 adaptive=False, constrained=False, canonical=False,
+                 sample_size=None, candidate_seconds=None,
+                 candidate_strings=None, candidate_retries=None,
+                 memo_size=None, packed_examples=False):
+        """
+        Args:
+            - max_complexity: upper bound (excluded) of the match count
+            - max_length: upper bound (excluded) of the regex length
+            - item_count, bloom_fpr, bloom_cls: setup of the repeat filter
+            - regex_cache_size: size of the compiled regex cache
+            - seed: seed of the random stream (ignored when `rng` is given)
+            - rng: the StreamRandom driving the generation. Candidate n
+                of its logical dataset only depends on (seed, n),
+                see StreamRandom.seek and StreamRandom.shard.
+            - stats: whether to collect the per-stage counters and latency
+                (see `stats`). When disabled, the stages run unwrapped.
+            - adaptive: tune the pattern generator parameters online
+                toward the most emitted (non-repeated) regex per second
+                (see `tuner`).
+                The output stays within max_complexity and max_length,
+                but it is no longer reproducible from the seed
+                since the tuning depends on timing.
+            - constrained: build the patterns within the length and
+                complexity bounds, the lower bound of the complexity
+                included (see PatternGenerator.get_random_pattern),
+                instead of rejecting the ones beyond them
+            - canonical: canonicalize the patterns (see `canonicalize`)
+                before the length filter and the repeat filter
+            - sample_size: draw at most `sample_size` distinct uniform
+                examples per regex (see Node.sample_uniform) instead of
+                enumerating all of them, which makes regex with millions
+                of matches affordable (with a large max_complexity).
+                A regex whose complexity counts repeated strings
+                (e.g., `a|a`) gets fewer examples.
+            - candidate_seconds, candidate_strings: limits of the validity
+                stage per candidate, on the wall time (from the compilation)
+                and on the number of examples to enumerate (or sample).
+                The candidates beyond them are rejected (see the 'limits'
+                stage of `stats`), so that a pathological regex cannot
+                stall the stream. None means no limit.
+                NOTE: the time is checked between two examples,
+                a single `fullmatch` call is not interrupted.
+            - candidate_retries: limit of the draws giving no new example
+                in the sampling of `sample_size` examples, after which
+                the candidate keeps the examples drawn so far
+                (None: 7 * sample_size, see Node.sample_uniform)
+            - memo_size: number of sub-patterns whose matching strings
+                are memoized across the candidates (see `memo`),
+                None to disable the memoization
+            - packed_examples: collect the examples as PackedExamples
+                (one UTF-8 buffer and offsets) instead of a list of str,
+                which is lighter to keep and to send between processes.
+                They are validated over the buffer once collected
+                (see PackedExamples.all_fullmatch).
+        """
+        self._config = {
+            'max_complexity': max_complexity,
+            'max_length': max_length,
+            'item_count': item_count,
+            'bloom_fpr': bloom_fpr,
+            'bloom_cls': bloom_cls,
+            'regex_cache_size': regex_cache_size,
+            'seed': seed,
+            'stats': stats,
+            'adaptive': adaptive,
+            'constrained': constrained,
+            'canonical': canonical,
+            'sample_size': sample_size,
+            'candidate_seconds': candidate_seconds,
+            'candidate_strings': candidate_strings,
+            'candidate_retries': candidate_retries,
+            'memo_size': memo_size,
+            'packed_examples': packed_examples
+        }
         self._max_complexity = max_complexity
         self._max_length = max_length
-        self._pattern_generator = PatternGenerator(
-            **self.initial_complexities
-        )
+        self._canonical = canonical
+        assert sample_size is None or sample_size > 0, 'sample_size should be > 0'
+        self._sample_size = sample_size
+        assert candidate_seconds is None or candidate_seconds > 0, \
+            'candidate_seconds should be > 0'
+        assert candidate_strings is None or candidate_strings > 0, \
+            'candidate_strings should be > 0'
+        assert candidate_retries is None or candidate_retries > 0, \
+            'candidate_retries should be > 0'
+        self._candidate_seconds = candidate_seconds
+        self._candidate_strings = candidate_strings
+        self._candidate_retries = candidate_retries
+        self._packed_examples = packed_examples
+        self._rng = StreamRandom(seed) if rng is None else rng
+        self._limits = {
+            'length_budget': max_length - 1,
+            'count_budget': max_complexity - 1
+        }
+        # the complexity filter keeps the complexity > 2:
+        self._budgets = dict(self._limits, count_floor=3) if constrained else {}
+        self._quotas = None
+        self._pattern_generator = self._build_pattern_generator(
+            self.initial_complexities)
+        if adaptive:
+            self._tuner = AdaptiveTuner(self.initial_complexities, seed=seed)
+            self._pattern_generators = {0: self._pattern_generator}
+        else:
+            self._tuner = None
         if bloom_cls is None:
             from pybloom import ScalableBloomFilter
             self._bloom = ScalableBloomFilter(item_count, bloom_fpr)
         else:
             self._bloom = bloom_cls(item_count, bloom_fpr)
+        self._regex_cache = LRUCache(regex_cache_size)
+        self._memo = None if memo_size is None else SubpatternMemo(memo_size)
+        self._stats = GenerationStats() if stats else None
+        self._batch_results = None
+        self._emitted = 0
+
+    @property
+    def config(self) -> dict:
+        """
+        Parameters of this generator
+        """
+        return dict(self._config, **self.initial_complexities)
+
+    @property
+    def rng(self) -> StreamRandom:
+        """
+        The random stream driving the generation
+        """
+        return self._rng
+
+    @property
+    def emitted(self) -> int:
+        """
+        Number of results yielded so far (over all calls of `generate`)
+        """
+        return self._emitted
+
+    @property
+    def bloom(self):
+        """
+        The repeat filter (a bloom filter, or a dedup store)
+        """
+        return self._bloom
+
+    @property
+    def regex_cache(self) -> LRUCache:
+        """
+        Cache of the compiled regex shared by the validation stages
+        (see `regex_cache.info()` for its hits and misses)
+        """
+        return self._regex_cache
+
+    @property
+    def memo(self):
+        """
+        The SubpatternMemo of the enumeration stage (None if disabled),
+        see `memo.info()` for its hit rate
+        """
+        return self._memo
+
+    @property
+    def tuner(self):
+        """
+        The AdaptiveTuner of the adaptive mode (None if disabled),
+        see `tuner.info()` for the best parameters found so far
+        """
+        return self._tuner
+
+    @property
+    def stats(self):
+        """
+        Live per-stage counters of the generation (None if disabled),
+        see `stats.snapshot()` for a JSON-able export
+
+        NOTE: with workers > 1, only the repeat filter runs
+        in this process, hence only its stage is counted.
+        """
+        return self._stats
+
+    def _timed(self, name, func):
+        """
+        Instrument a map stage (no-op when the stats are disabled)
+        """
+        if self._stats is None:
+            return func
+        return self._stats.timed(name, func)
+
+    def _checked(self, name, predicate):
+        """
+        Instrument a filter stage (no-op when the stats are disabled)
+        """
+        if self._stats is None:
+            return predicate
+        return self._stats.checked(name, predicate)
 
     @property
     def initial_complexities(self) -> dict:
@@ -57,121 +257,437 @@ class RegexGenerator:
             'complex_group_prob': 0.5
         }
 
-    def generate(self):
+    def generate(self, workers: int = 1, batch_size: int = 16,
+                 checkpoint=None, quotas=None):
         """
         Generating non-repeating complexity-in-ranged random regex,
         as well as its complexity, length, and examples
+
+        Args:
+            - workers: number of processes producing candidates.
+                With workers > 1, the generation and validation run
+                in worker processes and only the repeat filter
+                runs in the calling process.
+            - batch_size: number of valid results a worker sends at once
+            - checkpoint: a Checkpoint saving this generator periodically,
+                to resume the run with `checkpoint.load()` (workers = 1 only)
+            - quotas: Quotas of results per (complexity, length) bucket:
+                the candidates of the full buckets are rejected before
+                the validity stage, the patterns are steered to the
+                unfilled buckets, and the generation stops once all
+                the quotas are met (workers = 1 only). It raises a
+                RuntimeError when the buckets left stay out of reach
+                (see Quotas.patience).
+        """
+        if quotas is not None:
+            assert workers == 1 and checkpoint is None, \
+                'quotas require workers = 1 and no checkpoint'
+            # the results have a complexity > 2 (see _complexity_filter):
+            unreachable = quotas.unreachable((3, self._max_complexity),
+                                             (1, self._max_length))
+            assert not unreachable, \
+                f'the buckets {unreachable} are beyond max_complexity or max_length'
+        self._quotas = quotas
+        if workers > 1:
+            assert checkpoint is None, 'checkpoints require workers = 1'
+            candidates = iter(ParallelProducer(
+                self._config, workers, self._rng, batch_size=batch_size))
+        else:
+            candidates = self.candidates()
+        results = self._filter_repeat(candidates)
+        if quotas is not None:
+            results = self._fill_quotas(results, quotas)
+        if checkpoint is not None:
+            results = checkpoint.track(self, results)
+        return results
+
+    def generate_batch(self, n: int) -> RegexBatch:
+        """
+        The next `n` non-repeating results, as columns (see RegexBatch)
+
+        Consecutive calls continue the same stream of results.
+        """
+        assert isinstance(n, int) and n >= 0, 'n should be >= 0'
+        if self._batch_results is None:
+            self._batch_results = self.generate()
+        return RegexBatch.from_results(islice(self._batch_results, n))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # the stream of generate_batch is restarted after unpickling:
+        state['_batch_results'] = None
+        return state
+
+    def state_dict(self) -> dict:
+        """
+        State to resume the generation at the current result boundary:
+        parameters, random stream position, emitted count and repeat filter
+        (see Checkpoint)
+        """
+        return {
+            'config': self._config,
+            'rng': self._rng.to_dict(),
+            'emitted': self._emitted,
+            'dedup': dump_dedup(self._bloom),
+            'tuner': self._tuner
+        }
+
+    @classmethod
+    def from_state_dict(cls, state: dict) -> 'RegexGenerator':
+        """
+        Generator resumed from `state_dict`
+        """
+        rng = state['rng']
+        stream = StreamRandom(rng['seed'], rng['offset'], rng['stride'])
+        stream.seek(rng['position'])
+        # the repeat filter is restored instead of built:
+        regex_generator = cls(**dict(state['config'], bloom_cls=lambda *_: None),
+                              rng=stream)
+        regex_generator._bloom = load_dedup(state['dedup'])
+        regex_generator._emitted = state['emitted']
+        if state['tuner'] is not None:
+            regex_generator._tuner = state['tuner']
+        regex_generator._config = state['config']
+        return regex_generator
+
+    def agenerate(self, prefetch: int = 64, batch_size: int = 4,
+                  workers: int = 1, executor=None):
+        """
+        Asynchronous version of `generate`, for `async for` loops:
+        the generation runs in an executor thread and keeps up to
+        `prefetch` results ready (see `aiterate`)
+
+        Args:
+            - prefetch: maximum number of results waiting to be consumed
+            - batch_size: number of results produced per executor call
+            - workers: number of processes producing candidates
+                (see `generate`), to keep the CPU-bound work
+                out of the event loop process
+            - executor: thread pool running the generation
+                (default: a dedicated single-thread pool)
+        """
+        return aiterate(self.generate(workers=workers), prefetch=prefetch,
+                        batch_size=batch_size, executor=executor)
+
+    def candidates(self):
+        """
+        Generating complexity-in-ranged valid random regex
+        (without filtering out the repeated ones)
         """
         return pipe(
             self.regex_producer(),
             self._complexity_filter,
             self._validity_filter,
-            self._filter_repeat,
         )
 
     def regex_producer(self):
         """
-        Generate regex and its complexity and length
+        Generate regex and its length
         """
-        return pipe(self._regex_producer(),
+        patterns = self._regex_producer()
+        if self._canonical:
+            # the canonical count is at most the original one, hence the
+            # patterns failing the complexity filter anyway are skipped first:
+            patterns = pipe(
+                patterns,
+                curried.filter(self._checked(
+                    'trivial', lambda rp: rp.count(cap=3) > 2)),
+                curried.map(self._timed('canonicalize', canonicalize)))
+        return pipe(patterns,
                     curried.map(lambda rp: {
                         'regex': rp.regex,
-                        'complexity': exrex.count(rp.regex),
-                        'length': len(rp.regex)
+                        'length': len(rp.regex),
+                        'pattern': rp
                     }))
 
     def _complexity_filter(self, x):
         """
-        Filter regex by its complexity and length
+        Filter regex by its length and complexity
+
+        NOTE: the stages are ordered from the cheapest to the most expensive:
+        the length check is free, and the counting stops
+        as soon as it reaches max_complexity.
         """
+        quotas = self._quotas
         return pipe(x,
-                    curried.filter(
-                        lambda x: x['complexity'] > 2 and x['complexity'] < self._max_complexity),
-                    curried.filter(lambda x: x['length'] >=
-                                   1 and x['length'] < self._max_length),
+                    curried.filter(self._checked(
+                        'length', lambda x: x['length'] >=
+                        1 and x['length'] < self._max_length)),
+                    *([curried.filter(self._checked(
+                        'quota_length', lambda x: quotas.wants_length(x['length'])))]
+                      if quotas is not None else []),
+                    curried.map(self._timed('count', self._add_complexity)),
+                    curried.filter(self._checked(
+                        'complexity',
+                        lambda x: x['complexity'] > 2 and x['complexity'] < self._max_complexity)),
+                    *([curried.filter(self._checked('quota', quotas.wants))]
+                      if quotas is not None else []),
                     )
 
     def _validity_filter(self, x):
         """
         Filter the regex by the validity of generated examples
+
+        NOTE: the enumeration of examples quits on the first
+        example that does not fullmatch the regex, or as soon
+        as the candidate goes beyond its limits.
         """
-        return pipe(x,
-                    curried.filter(lambda x: self._can_fullmatch(x['regex'])),
-                    curried.map(self._add_examples),
-                    curried.filter(lambda x: isinstance(x['examples'], list)),
-                    curried.filter(
-                        lambda x: len(
-                            x['examples']) == x['complexity']),
-                    curried.filter(self._all_examples_fullmatch),
+        stages = [
+            curried.map(self._timed('compile', self._add_compiled)),
+            curried.filter(self._checked(
+                'can_fullmatch', self._can_fullmatch)),
+            curried.map(self._timed(
+                'expand',
+                self._add_examples if self._sample_size is None
+                else self._add_sampled_examples))
+        ]
+        if self._candidate_seconds is not None or \
+                self._candidate_strings is not None:
+            stages.append(curried.filter(self._checked(
+                'limits', lambda x: x['examples'] is not OVER_LIMITS)))
+        return pipe(x, *stages,
+                    curried.filter(self._checked(
+                        'examples', lambda x: isinstance(x['examples'], (list, PackedExamples)))),
+                    curried.filter(self._checked(
+                        'example_count', self._has_example_count)),
+                    curried.map(self._drop_state),
                     )
 
     def _regex_producer(self):
         """
         Generate random regex from the pattern generator
         """
+        produce = self._timed('produce', self._next_pattern)
         while True:
-            yield self._pattern_generator.get_random_pattern()
+            yield produce()
+
+    def _next_pattern(self):
+        """
+        Generate the pattern of the next candidate of the random stream
+        """
+        self._rng.advance()
+        if self._tuner is not None:
+            self._pattern_generator = self._get_tuned_pattern_generator(
+                self._tuner.step())
+        budgets = self._budgets
+        if self._quotas is not None:
+            self._quotas.step()
+            bucket = self._quotas.choose(self._rng)
+            if bucket is not None:
+                # within the bucket, keeping the count_floor of constrained:
+                budgets = dict(budgets, **{
+                    key: min(budget, self._limits[key])
+                    for key, budget in self._quotas.budgets(bucket).items()
+                })
+        return self._pattern_generator.get_random_pattern(**budgets)
+
+    def _build_pattern_generator(self, params: dict) -> PatternGenerator:
+        return PatternGenerator(
+            **params,
+            lazy_groups=True,
+            backend='string',
+            rng=self._rng
+        )
 
-    def _can_fullmatch(self, regex_str: str) -> bool:
+    def _get_tuned_pattern_generator(self, arm: int) -> PatternGenerator:
+        """
+        The pattern generator of the `arm`-th setting of the tuner
+        """
+        if arm not in self._pattern_generators:
+            self._pattern_generators[arm] = self._build_pattern_generator(
+                self._tuner.settings[arm])
+        return self._pattern_generators[arm]
+
+    def _add_complexity(self, result: dict) -> dict:
+        """
+        Add the count of matching strings (saturated at max_complexity)
+        """
+        result['complexity'] = result['pattern'].count(
+            cap=self._max_complexity)
+        return result
+
+    def _compile(self, regex: str) -> re.Pattern:
+        """
+        Compile the regex through the shared cache
+        """
+        return self._regex_cache.get_or_create(regex, re.compile)
+
+    def _add_compiled(self, result: dict) -> dict:
+        """
+        Add the compiled regex, used by all the following stages
+        """
+        if self._candidate_seconds is not None:
+            result['deadline'] = time.perf_counter() + self._candidate_seconds
+        result['compiled'] = self._compile(result['regex'])
+        return result
+
+    def _can_fullmatch(self, result: dict) -> bool:
         """
         Assert fullmatching is possible
         """
-        example = exrex.getone(regex_str)
-        return bool(re.compile(regex_str).fullmatch(example))
+        example = result['pattern'].sample(self._rng)
+        return bool(result['compiled'].fullmatch(example))
 
     def _add_example(self, result: dict) -> dict:
         """
-        Add one single example
+        Add one single example, drawn uniformly
         """
-        result['example'] = exrex.getone(result['regex'])
-        while not bool(re.compile(
-                result['regex']).fullmatch(result['example'])):
-            result['example'] = exrex.getone(result['regex'])
+        com = result.get('compiled') or self._compile(result['regex'])
+        pattern = result['pattern']
+        retries = self._candidate_retries
+        result['example'] = pattern.unrank(self._rng.randrange(pattern.size()))
+        while not bool(com.fullmatch(result['example'])):
+            if retries is not None:
+                if retries == 0:
+                    # beyond candidate_retries:
+                    result['example'] = None
+                    break
+                retries -= 1
+            result['example'] = pattern.unrank(
+                self._rng.randrange(pattern.size()))
         return result
 
     def _add_examples(self, result):
         """
         Generating of multiple examples
+
+        The enumeration stops at the first example that does not
+        fullmatch the regex (examples = None), right after
+        it goes beyond the expected complexity, or when the
+        candidate goes beyond its limits (examples = OVER_LIMITS).
+        With packed_examples, the examples are validated once packed.
         """
-        regex = result['regex']
-        try:
-            examples = []
-            for example in exrex.generate(regex):
-                examples.append(example)
-            result['examples'] = examples
+        if self._over_strings(result['complexity']):
+            result['examples'] = OVER_LIMITS
             return result
-        except TypeError as e:
-            if e.args[0] == 'can only concatenate list (not "str") to list':
+        com = result['compiled']
+        fullmatch = None if self._packed_examples else com.fullmatch
+        deadline = result.get('deadline')
+        examples = []
+        for example in islice(result['pattern'].expand(self._memo),
+                              result['complexity'] + 1):
+            if fullmatch is not None and not fullmatch(example):
                 result['examples'] = None
                 return result
-            elif e.args[0] == 'can only concatenate str (not "list") to str':
+            examples.append(example)
+            if deadline is not None and time.perf_counter() > deadline:
+                result['examples'] = OVER_LIMITS
+                return result
+        result['examples'] = examples if fullmatch is not None \
+            else self._packed(examples, com)
+        return result
+
+    def _add_sampled_examples(self, result: dict) -> dict:
+        """
+        Sampling version of _add_examples: up to sample_size distinct
+        examples drawn uniformly (all of them when there are fewer)
+        """
+        if self._over_strings(self._example_count(result)):
+            result['examples'] = OVER_LIMITS
+            return result
+        com = result['compiled']
+        fullmatch = None if self._packed_examples else com.fullmatch
+        deadline = result.get('deadline')
+        examples = []
+        for example in result['pattern'].iter_sample_uniform(
+                self._sample_size, self._rng, self._candidate_retries):
+            if fullmatch is not None and not fullmatch(example):
                 result['examples'] = None
                 return result
-            else:
-                raise e
-
-    def _all_examples_fullmatch(self, result: dict) -> bool:
-        """
-        Check whether all examples fullmatch the regex
-        """
-        com = re.compile(result['regex'])
-        answers = []
-        for example in result['examples']:
-            try:
-                ans = bool(com.fullmatch(example))
-            except TypeError as e:
-                if e.args[0] == 'expected string or bytes-like object':
-                    return False
-                else:
-                    raise e
-            answers.append(ans)
-        return all(answers)
+            examples.append(example)
+            if deadline is not None and time.perf_counter() > deadline:
+                result['examples'] = OVER_LIMITS
+                return result
+        result['examples'] = examples if fullmatch is not None \
+            else self._packed(examples, com)
+        return result
+
+    def _over_strings(self, count: int) -> bool:
+        """
+        Whether enumerating `count` examples goes beyond candidate_strings
+        """
+        return self._candidate_strings is not None and \
+            count > self._candidate_strings
+
+    def _example_count(self, result: dict) -> int:
+        """
+        Expected number of examples of a valid result
+        """
+        if self._sample_size is None:
+            return result['complexity']
+        return min(result['complexity'], self._sample_size)
+
+    def _has_example_count(self, result: dict) -> bool:
+        """
+        Whether a result has its expected number of examples.
+        The sampled examples are distinct, hence they can be fewer
+        when the complexity counts repeated strings (at least one).
+        """
+        if self._sample_size is None:
+            return len(result['examples']) == result['complexity']
+        return 1 <= len(result['examples']) <= self._example_count(result)
+
+    @staticmethod
+    def _drop_state(result: dict) -> dict:
+        """
+        Remove the per-candidate state (pattern tree and compiled regex)
+        once the result is validated
+        """
+        del result['pattern']
+        del result['compiled']
+        result.pop('deadline', None)
+        return result
+
+    @staticmethod
+    def _packed(examples: typing.List[str], com: re.Pattern) \
+            -> typing.Optional[PackedExamples]:
+        """
+        The examples packed (see packed_examples) and validated
+        over their buffer, None if one does not fullmatch the regex
+        """
+        packed = PackedExamples.pack(examples)
+        return packed if packed.all_fullmatch(com) else None
+
+    @staticmethod
+    def _fill_quotas(results, quotas):
+        """
+        Record the results into their quotas, until all are met
+        """
+        if quotas.done:
+            return
+        for result in results:
+            yield quotas.add(result)
+            if quotas.done:
+                return
 
     def _filter_repeat(self, iterable):
         """
         Filter out the repeated regex pattern
         """
+        is_new = self._checked('repeat', self._is_new)
+        stats = self._stats
+        if stats is not None:
+            stats.resume()
         for x in iterable:
-            if x['regex'] not in self._bloom:
+            if is_new(x):
+                # added before yielding, so that the last result is
+                # recorded even if the consumer never resumes.
+                # A filter shared by several processes returns True
+                # if another one added the regex since the lookup:
+                if self._bloom.add(x['regex']) is True:
+                    continue
+                self._emitted += 1
+                if stats is not None:
+                    stats.accept()
+                if self._tuner is not None:
+                    # only the emitted results are credited, not the repeats:
+                    self._tuner.accept(x)
                 yield x
-                self._bloom.add(x['regex'])
+                if stats is not None:
+                    stats.resume()
+
+    def _is_new(self, result: dict) -> bool:
+        """
+        Whether the regex is not seen yet by the repeat filter
+        """
+        return result['regex'] not in self._bloom
@@ -0,0 +1,67 @@
+r"""
+Memoization of the matching strings of sub-patterns
+
+The generated patterns reuse the same sub-patterns over and over, within
+a regex (a group and its repeated versions, e.g., `((a\s)(a\s)(a\s))`)
+and across regex. A SubpatternMemo keeps the matching strings of the
+sub-patterns, by their regex (which determines the strings and their
+order), in a bounded LRU cache shared by all the candidates of a
+RegexGenerator, so that each one is enumerated once.
+
+Only the sub-patterns matching from `min_strings` to `max_strings`
+strings are memoized: enumerating fewer strings costs less than
+rendering the key, and more strings would hold too much memory.
+The strings are also kept on the node itself, so that the repeated
+occurrences of a same node object within a pattern are free.
+
+NOTE: the counts are not memoized: counting a pattern is integer
+arithmetic over its nodes, which costs less than rendering the regex
+of each sub-pattern to look it up.
+"""
+import typing
+from .cache import LRUCache
+from .engine import Node, Chars
+
+__all__ = ['SubpatternMemo']
+
+
+class SubpatternMemo:
+    """
+    LRU cache of the matching strings of sub-patterns,
+    passed to Node.expand
+
+    Args:
+        - maxsize: number of sub-patterns kept
+        - min_strings, max_strings: bounds of the number of
+            matching strings of the memoized sub-patterns
+    """
+
+    def __init__(self, maxsize: int = 4096, min_strings: int = 8,
+                 max_strings: int = 1000):
+        assert isinstance(min_strings, int) and isinstance(max_strings, int) \
+            and 0 < min_strings <= max_strings, \
+            'min_strings and max_strings should satisfy 0 < min_strings <= max_strings'
+        self.strings = LRUCache(maxsize)
+        self._min_strings = min_strings
+        self._max_strings = max_strings
+
+    def expand(self, node: Node) -> typing.Iterable[str]:
+        """
+        Matching strings of a sub-pattern (see Node.expand)
+        """
+        if isinstance(node, Chars):
+            return node.chars
+        strings = node._strings
+        if strings is None:
+            size = node.size()
+            if size < self._min_strings or size > self._max_strings:
+                return node.expand(self)
+            strings = node._strings = self.strings.get_or_create(
+                node.regex, lambda _: tuple(node.expand(self)))
+        return strings
+
+    def info(self) -> dict:
+        """
+        Snapshot of the cache usage (see LRUCache.info)
+        """
+        return self.strings.info()
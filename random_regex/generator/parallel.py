@@ -0,0 +1,112 @@
+"""
+Multi-process production of regex candidates
+
+Each worker process owns a private RegexGenerator and runs the
+PatternGenerator -> complexity -> validity stages on its own.
+Valid results are sent back to the parent in batches, where the
+global repeat filter is applied.
+"""
+import multiprocessing
+import queue as queue_module
+import traceback
+import typing
+from itertools import islice
+
+# seconds between two checks of the workers while waiting for a batch
+POLL_SECONDS = 1.
+
+
+class WorkerError(RuntimeError):
+    """
+    Error raised in a worker process, re-raised in the parent
+    """
+
+
+def _produce(config: dict, rng, index: int, queue, batch_size: int):
+    """
+    Worker loop: push batches of valid (not yet de-duplicated) results,
+    along with the position of the worker stream after them
+    """
+    try:
+        from .generator import RegexGenerator
+        # the repeat filter of a worker is private (the global one runs in the parent):
+        regex_generator = RegexGenerator(**dict(config, rng=rng, bloom_cls=None))
+        candidates = regex_generator.candidates()
+        if regex_generator.tuner is not None:
+            # the tuner is credited with the results new to this worker:
+            candidates = regex_generator._filter_repeat(candidates)
+        while True:
+            batch = list(islice(candidates, batch_size))
+            queue.put((index, rng.position, batch))
+    except Exception:
+        queue.put((index, None, traceback.format_exc()))
+
+
+class ParallelProducer:
+    """
+    Merge the candidate streams of several worker processes
+
+    Each worker draws from its own shard of `rng`,
+    so the workers cover disjoint candidates of the same logical dataset.
+    `rng` is moved past the candidates drawn by the workers as their
+    batches arrive, so that it records the position of the run and
+    the next shards cover new candidates.
+
+    A worker failing raises a WorkerError (with the worker traceback),
+    and a worker killed raises a WorkerError with its exit code.
+    """
+
+    def __init__(self, config: dict, workers: int, rng,
+                 batch_size: int = 16, prefetch: int = 4):
+        assert isinstance(workers, int) and workers > 0, 'workers should be > 0'
+        assert isinstance(batch_size, int) and batch_size > 0, 'batch_size should be > 0'
+        self._config = config
+        self._workers = workers
+        self._rng = rng
+        self._batch_size = batch_size
+        self._prefetch = prefetch
+
+    def __iter__(self) -> typing.Iterator[dict]:
+        ctx = multiprocessing.get_context()
+        queue = ctx.Queue(maxsize=self._workers * self._prefetch)
+        start = self._rng.position
+        processes = [
+            ctx.Process(
+                target=_produce,
+                args=(self._config, self._rng.shard(index, self._workers),
+                      index, queue, self._batch_size),
+                daemon=True
+            ) for index in range(self._workers)
+        ]
+        positions = [0] * self._workers
+        for process in processes:
+            process.start()
+        try:
+            while True:
+                try:
+                    index, position, batch = queue.get(timeout=POLL_SECONDS)
+                except queue_module.Empty:
+                    self._check(processes)
+                    continue
+                if position is None:
+                    raise WorkerError(f'worker {index} failed:\n{batch}')
+                # the candidates before it are drawn by the workers (or skipped):
+                positions[index] = position
+                self._rng.seek(start + max(positions) * self._workers)
+                yield from batch
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
+            queue.close()
+
+    @staticmethod
+    def _check(processes: typing.List[multiprocessing.Process]) -> None:
+        """
+        Raise a WorkerError if a worker is dead
+        """
+        for index, process in enumerate(processes):
+            if not process.is_alive():
+                raise WorkerError(
+                    f'worker {index} exited with code {process.exitcode}')
@@ -0,0 +1,195 @@
+"""
+Quotas of results per (complexity, length) bucket
+
+A dataset balanced across the complexity and the length of the regex
+keeps a target count of results per bucket. The short and simple regex
+fill their buckets first, and the candidates of the full buckets are
+then rejected before the validity stage (see RegexGenerator.generate).
+
+The bucket of each candidate is also steered: the candidate targets a
+bucket drawn with a weight of its missing count, and its pattern is
+built within the upper bounds of that bucket (the length and count
+budgets of PatternGenerator.get_random_pattern). Only the upper bounds
+can be steered: the candidates of a bucket also land in the lower ones,
+whose quotas hence fill first.
+
+A bucket out of the bounds of the generator is refused by `generate`,
+and the generation stops with a RuntimeError after `patience` candidates
+in a row filling no bucket (e.g., short regex of a large complexity).
+"""
+import bisect
+import typing
+
+__all__ = ['Quotas']
+
+Bucket = typing.Tuple[int, int]
+
+
+class Quotas:
+    """
+    Target counts of results per (complexity, length) bucket
+
+    Args:
+        - complexity_edges: increasing edges of the complexity buckets,
+            the i-th bucket is [complexity_edges[i], complexity_edges[i + 1])
+        - length_edges: increasing edges of the length buckets
+        - targets: count per bucket, either the same int for every
+            bucket or a dict {(complexity bucket, length bucket): count}
+            (the missing buckets get no result)
+        - patience: number of candidates in a row filling no bucket
+            after which the generation stops with a RuntimeError
+    """
+
+    def __init__(self, complexity_edges: typing.Sequence[int],
+                 length_edges: typing.Sequence[int],
+                 targets: typing.Union[int, typing.Dict[Bucket, int]],
+                 patience: int = 100000):
+        for edges in (complexity_edges, length_edges):
+            assert len(edges) >= 2 and all(
+                a < b for a, b in zip(edges, edges[1:])), \
+                'edges should be at least 2 increasing values'
+        self.complexity_edges = tuple(complexity_edges)
+        self.length_edges = tuple(length_edges)
+        if isinstance(targets, int):
+            targets = {
+                (i, j): targets
+                for i in range(len(complexity_edges) - 1)
+                for j in range(len(length_edges) - 1)
+            }
+        assert all(count >= 0 for count in targets.values()), \
+            'targets should be >= 0'
+        assert patience > 0, 'patience should be > 0'
+        self.targets = dict(targets)
+        self.counts = {bucket: 0 for bucket in self.targets}
+        self.patience = patience
+        self._stalled = 0
+
+    @staticmethod
+    def _index(edges: typing.Tuple[int, ...], value: int) -> typing.Optional[int]:
+        index = bisect.bisect_right(edges, value) - 1
+        return index if 0 <= index < len(edges) - 1 else None
+
+    def bucket(self, complexity: int, length: int) -> typing.Optional[Bucket]:
+        """
+        The bucket of a result (None if out of the edges)
+        """
+        i = self._index(self.complexity_edges, complexity)
+        j = self._index(self.length_edges, length)
+        if i is None or j is None:
+            return None
+        return i, j
+
+    def missing(self, bucket: typing.Optional[Bucket]) -> int:
+        """
+        Number of results the bucket still needs
+        """
+        if bucket not in self.targets:
+            return 0
+        return self.targets[bucket] - self.counts[bucket]
+
+    def wants(self, result: dict) -> bool:
+        """
+        Whether the bucket of a result (with its complexity) is not full
+        """
+        return self.missing(self.bucket(result['complexity'], result['length'])) > 0
+
+    def wants_length(self, length: int) -> bool:
+        """
+        Whether a bucket of this length is not full
+        (checked before counting the complexity)
+        """
+        j = self._index(self.length_edges, length)
+        return j is not None and any(
+            self.missing(bucket) > 0 for bucket in self.targets if bucket[1] == j)
+
+    def add(self, result: dict) -> dict:
+        """
+        Record an emitted result (in a map stage)
+        """
+        bucket = self.bucket(result['complexity'], result['length'])
+        if bucket in self.counts:
+            self.counts[bucket] += 1
+            self._stalled = 0
+        return result
+
+    def step(self) -> None:
+        """
+        Record a new candidate, raise a RuntimeError after
+        `patience` candidates in a row filling no bucket
+        """
+        self._stalled += 1
+        if self._stalled > self.patience:
+            missing = sorted(bucket for bucket in self.targets
+                             if self.missing(bucket) > 0)
+            raise RuntimeError(
+                f'no bucket filled by the last {self.patience} candidates, '
+                f'the buckets {missing} may be out of reach')
+
+    def unreachable(self, complexity_range: typing.Tuple[int, int],
+                    length_range: typing.Tuple[int, int]) -> typing.List[Bucket]:
+        """
+        The buckets with a target out of the [lower, upper) ranges
+        of the complexity and the length of the results
+        """
+        return sorted(
+            (i, j) for (i, j), target in self.targets.items()
+            if target > 0 and not (
+                _overlap(self.complexity_edges[i:i + 2], complexity_range) and
+                _overlap(self.length_edges[j:j + 2], length_range)))
+
+    @property
+    def done(self) -> bool:
+        """
+        Whether every bucket reached its target
+        """
+        return all(self.missing(bucket) <= 0 for bucket in self.targets)
+
+    def choose(self, rng) -> typing.Optional[Bucket]:
+        """
+        Draw an unfilled bucket, with a weight of its missing count
+        (None if all are full)
+        """
+        unfilled = [(bucket, self.missing(bucket)) for bucket in self.targets
+                    if self.missing(bucket) > 0]
+        if not unfilled:
+            return None
+        point = rng.random() * sum(count for _, count in unfilled)
+        for bucket, count in unfilled:
+            point -= count
+            if point < 0:
+                return bucket
+        return unfilled[-1][0]
+
+    def budgets(self, bucket: Bucket) -> dict:
+        """
+        Budgets of PatternGenerator.get_random_pattern keeping
+        the pattern within the upper bounds of a bucket
+        """
+        i, j = bucket
+        return {
+            'count_budget': self.complexity_edges[i + 1] - 1,
+            'length_budget': self.length_edges[j + 1] - 1
+        }
+
+    def info(self) -> dict:
+        """
+        Snapshot of the counts and targets, by bucket
+        """
+        return {
+            'done': self.done,
+            'buckets': [
+                {
+                    'complexity': self.complexity_edges[i:i + 2],
+                    'length': self.length_edges[j:j + 2],
+                    'count': self.counts[(i, j)],
+                    'target': target
+                } for (i, j), target in sorted(self.targets.items())
+            ]
+        }
+
+
+def _overlap(a: typing.Sequence[int], b: typing.Sequence[int]) -> bool:
+    """
+    Whether two [lower, upper) ranges overlap
+    """
+    return max(a[0], b[0]) < min(a[1], b[1])
@@ -1,7 +1,8 @@
+import itertools
 import typing
 import random
-import string
-from regexfactory.pattern import escape, join
+import re
+import sys
 from regexfactory.pattern import RegexPattern
 # TODO: [X] consider random special characters
 from regexfactory.chars import (
@@ -16,29 +17,55 @@ from regexfactory.chars import (
     # ANCHOR_START, ANCHOR_END
 )
 from regexfactory.patterns import (
-    # TODO: [X] Operators for matching single char:
-    Range,
-    Set,
-    NotSet,
-    # TODO: [X] Operators for long string
-    Group,
-    Or,
-    # TODO: [X] Work on character level (need to wrap input into Group in
-    # order to
     Amount,
-    Multi,
+    Multi
+)
+# NOTE: the generated patterns are engine Nodes, rendering the same regex
+# as the regexfactory patterns (see Node.to_pattern):
+from .engine import (
+    CATEGORY_CHARS,
+    ANY_CHARS,
+    Node,
+    # TODO: [X] Operators for matching single char: (Range, Set, NotSet)
+    Chars,
+    # TODO: [X] Operators for long string: (Group, Or)
+    Concat,
+    Capture,
+    Union,
+    # TODO: [X] Work on character level (need to wrap input into Group in
+    # order to (Amount, Optional)
+    Repeat,
     Optional
-    # Commet -> no effect
 )
+from .alphabet import (
+    ANY_MASK,
+    PRINTABLES,
+    RANGE_CHARS,
+    SET_SPECIAL_CHARS,
+    ATOM_REGEX,
+    ATOM_CHARS,
+    ATOM_MASK,
+    ATOM_RANK,
+    ATOM_COMPLEMENT,
+    chars_of
+)
+from .cache import LRUCache
 
 __all__ = ['PatternGenerator']
 
-PRINTABLES: typing.List[str] = []
-PRINTABLES.extend(string.ascii_letters)
-PRINTABLES.extend(string.digits)
-PRINTABLES.extend(string.hexdigits)
-PRINTABLES.extend(string.octdigits)
-PRINTABLES.extend(string.punctuation)
+
+def _unbounded(budget: typing.Optional[int]) -> int:
+    return sys.maxsize if budget is None else budget
+
+
+def _fits(node: Node, length_budget: int, count_budget: int,
+          count_floor: int = 1) -> bool:
+    """
+    Whether the node fits both budgets and matches at least
+    `count_floor` strings
+    """
+    return len(node.regex) <= length_budget and \
+        count_floor <= node.count(cap=count_budget + 1) <= count_budget
 
 
 class Wrapper:
@@ -46,40 +73,43 @@ class Wrapper:
     Warp pattern by Amount, Multi, Optional
     """
     @staticmethod
-    def wrap_into_limit_amount(pattern: RegexPattern,
-                               amount_complexity: int) -> Amount:
+    def wrap_into_limit_amount(pattern: Node,
+                               amount_complexity: int,
+                               rng: typing.Any = random) -> Repeat:
         """
         For wraping a pattern into multiple amount pattern
         (only support limited repeativeness)
         """
-        lower_bound = random.randint(0, amount_complexity)
-        if random.uniform(0, 1) < 0.5:
+        lower_bound = rng.randint(0, amount_complexity)
+        if rng.random() < 0.5:
             # fix amount
-            return Amount(pattern, lower_bound, j=None, or_more=False)
+            return Repeat(pattern, lower_bound, lower_bound, fixed=True)
         else:
             # amount of a range
-            upper_bound = lower_bound + random.randint(0, amount_complexity)
-            return Amount(pattern, lower_bound, j=upper_bound, or_more=False)
+            upper_bound = lower_bound + rng.randint(0, amount_complexity)
+            return Repeat(pattern, lower_bound, upper_bound)
 
     @staticmethod
     def __wrap_into_amount(pattern: RegexPattern,
-                           amount_complexity: int) -> Amount:
-        if random.uniform(0, 1) < 0.25:
+                           amount_complexity: int,
+                           rng: typing.Any = random) -> Amount:
+        if rng.random() < 0.25:
             or_more = True
         else:
             or_more = False
-        lower_bound = random.randint(0, amount_complexity)
-        if random.uniform(0, 1) < 0.25:
+        lower_bound = rng.randint(0, amount_complexity)
+        if rng.random() < 0.25:
             # no upper bound
             return Amount(pattern, lower_bound, j=None, or_more=or_more)
         else:
             # with upper bound
-            upper_bound = lower_bound + random.randint(0, amount_complexity)
+            upper_bound = lower_bound + rng.randint(0, amount_complexity)
             return Amount(pattern, lower_bound, j=upper_bound, or_more=or_more)
 
     @staticmethod
-    def __wrap_into_multi(pattern: RegexPattern) -> Multi:
-        if random.uniform(0, 1) < 0.5:
+    def __wrap_into_multi(pattern: RegexPattern,
+                          rng: typing.Any = random) -> Multi:
+        if rng.random() < 0.5:
             return Multi(pattern, match_zero=True)
         else:
             return Multi(pattern, match_zero=False)
@@ -88,19 +118,36 @@ class Wrapper:
 class CharGenerator:
     """
     Char-level RegexPattern Generator
+
+    The Range and Set/NotSet patterns are drawn as ints indexing the
+    precomputed tables of `alphabet`, and the patterns are built once
+    per drawn key (see `ranges` and `sets`): the members of a NotSet are
+    the bits of a bitset, and the complementary special chars of a set
+    (e.g., \\s and \\S) are excluded without re-drawing the set.
     """
     special_chars_without_any = [
-        WHITESPACE,
-        NOTWHITESPACE,
-        WORD,
-        NOTWORD,
-        DIGIT,
-        NOTDIGIT
+        Chars(char.regex, CATEGORY_CHARS[char.regex]) for char in [
+            WHITESPACE,
+            NOTWHITESPACE,
+            WORD,
+            NOTWORD,
+            DIGIT,
+            NOTDIGIT
+        ]
     ]
-    printable_escapes = [escape(x) for x in PRINTABLES]
+    any_char = Chars(ANY.regex, ANY_CHARS)
+    printable_escapes = [Chars(re.escape(x), x) for x in PRINTABLES]
+    plain_special_chars = special_chars_without_any + [any_char]
+    # Range patterns by (first, last) code point
+    ranges: typing.Dict[typing.Tuple[int, int], Chars] = {}
+    # Set/NotSet patterns by (sorted atom indices, negated)
+    sets = LRUCache(65536)
+    # extra chars drawn to reach the count floor of get_random_chars:
+    budget_retries = 8
 
     def __init__(self, set_complexity: int, amount_complexity: int,
-                 special_char_prob: float = 0.5, complex_char_prob: float = 0.5):
+                 special_char_prob: float = 0.5, complex_char_prob: float = 0.5,
+                 rng: typing.Optional[random.Random] = None):
         assert isinstance(
             set_complexity, int) and set_complexity > 0, 'set complexity should be > 0'
         assert isinstance(
@@ -113,13 +160,41 @@ class CharGenerator:
         self._amount_complexity = amount_complexity
         self._special_char_prob = special_char_prob
         self._complex_char_prob = complex_char_prob
+        self._rng: typing.Any = random if rng is None else rng
 
-    def get_random_chars(self, length: int) -> typing.List[RegexPattern]:
+    def get_random_chars(self, length: int,
+                         length_budget: typing.Optional[int] = None,
+                         count_budget: typing.Optional[int] = None,
+                         count_floor: int = 1) -> typing.List[Node]:
         """
         Generate a List of single char regex pattern
         with repeat select
+
+        With budgets, the chars that do not fit the remaining
+        regex length (length_budget) or match count (count_budget)
+        of the list are skipped. With `count_floor`, the chars have to
+        bring the count of the list up to `count_floor` (the first one
+        that fits, since the counts multiply), and up to `budget_retries`
+        more chars are drawn until they do.
         """
-        result = [self._get_random_char() for _ in range(length)]
+        if length_budget is None and count_budget is None and count_floor == 1:
+            return [self._get_random_char() for _ in range(length)]
+        length_budget = _unbounded(length_budget)
+        count_budget = _unbounded(count_budget)
+        result = []
+        count = 1
+        position = 0
+        while position < length or (
+                count < count_floor and position < length + self.budget_retries):
+            # the floor left to reach (1 once reached):
+            floor = -(-count_floor // count)
+            position += 1
+            char = self._get_random_char()
+            if _fits(char, length_budget, count_budget, floor):
+                result.append(char)
+                length_budget -= len(char.regex)
+                count *= char.count()
+                count_budget //= char.count()
         return result
 
     def _get_random_char(self):
@@ -142,24 +217,24 @@ class CharGenerator:
         else:
             simple char
         """
-        if random.uniform(0, 1) < self._complex_char_prob:
-            if random.uniform(0, 1) < 0.5:
+        if self._rng.random() < self._complex_char_prob:
+            if self._rng.random() < 0.5:
                 return self._get_random_amount()
             else:
                 return self._get_random_simple_char()
         else:
             return self._get_random_simple_char()
 
-    def _get_random_amount(self) -> Amount:
+    def _get_random_amount(self) -> Repeat:
         """
         warp _get_random_simple_char into Amount
         """
         char = self._get_random_simple_char()
         amount_char = Wrapper.wrap_into_limit_amount(
-            char, self._amount_complexity)
+            char, self._amount_complexity, rng=self._rng)
         return amount_char
 
-    def _get_random_simple_char(self) -> RegexPattern:
+    def _get_random_simple_char(self) -> Chars:
         """
         select by special char probability
 
@@ -172,73 +247,105 @@ class CharGenerator:
         else:
             printable char
         """
-        if random.uniform(0, 1) < self._special_char_prob:
-            p = random.uniform(0, 1)
+        if self._rng.random() < self._special_char_prob:
+            p = self._rng.random()
             if p <= 0.333:
-                return CharGenerator._get_random_plain_special_char()
+                return CharGenerator._get_random_plain_special_char(self._rng)
             elif p <= 0.666:
-                return CharGenerator._get_random_range()
+                return CharGenerator._get_random_range(self._rng)
             else:
                 return self._get_random_set()
         else:
-            return CharGenerator._get_random_printables()
+            return CharGenerator._get_random_printables(self._rng)
 
     @staticmethod
-    def _get_random_plain_special_char() -> RegexPattern:
-        return random.choice(CharGenerator.special_chars_without_any + [ANY])
+    def _get_random_plain_special_char(rng: typing.Any = random) -> Chars:
+        return rng.choice(CharGenerator.plain_special_chars)
 
     @staticmethod
-    def _get_random_range() -> Range:
+    def _get_random_range(rng: typing.Any = random) -> Chars:
         """
         Generate a random regex Range pattern
         [s-e], where s and e are some printable chars
         """
-        chars = random.choices(string.printable, k=2)
-        if ord(chars[0]) <= ord(chars[1]):
-            return Range(escape(chars[0]), escape(chars[1]))
-        else:
-            return Range(escape(chars[1]), escape(chars[0]))
+        # the draws of rng.choices(RANGE_CHARS, k=2):
+        start = ord(RANGE_CHARS[int(rng.random() * len(RANGE_CHARS))])
+        end = ord(RANGE_CHARS[int(rng.random() * len(RANGE_CHARS))])
+        key = (start, end) if start <= end else (end, start)
+        result = CharGenerator.ranges.get(key)
+        if result is None:
+            result = CharGenerator.ranges[key] = Chars(
+                f'[{re.escape(chr(key[0]))}-{re.escape(chr(key[1]))}]',
+                [chr(x) for x in range(key[0], key[1] + 1)])
+        return result
 
-    def _get_random_set(self) -> typing.Union[Set, NotSet]:
+    def _get_random_set(self) -> Chars:
         """
         Generate a random Set/NotSet pattern.
         NOTE that Any (.) is not a special character in set. Hence, it is excluded.
         """
-        count = random.randint(1, self._set_complexity)
-        chars = CharGenerator.__get_random_non_repeating_chars(count)
-        pattern = join(*chars)
-        if random.uniform(0, 1) < 0.5:
-            return Set(pattern)
-        else:
-            return NotSet(pattern)
+        count = self._rng.randint(1, self._set_complexity)
+        atoms = CharGenerator.__get_random_non_repeating_chars(
+            count, self._rng)
+        key = (atoms, self._rng.random() >= 0.5)
+        chars = CharGenerator.sets.get_or_create(key, _build_set)
+        if not chars.chars:
+            # the complement of the atoms is empty (e.g., [^\S\W]),
+            # the Set of the same atoms is used instead:
+            chars = CharGenerator.sets.get_or_create((atoms, False), _build_set)
+        return chars
 
     @staticmethod
     def __get_random_non_repeating_chars(
-            count: int) -> typing.List[RegexPattern]:
-        """
-        Generate a list of single char regex pattern
-        without repeat select
-        """
-        candidates = CharGenerator.special_chars_without_any + \
-            CharGenerator.printable_escapes
-        try:
-            result = random.sample(candidates, count)
-        except ValueError:
-            result = CharGenerator.printable_escapes
-        while (
-            (WHITESPACE in result) and (NOTWHITESPACE in result)
-        ) or (
-            (WORD in result) and (NOTWORD in result)
-        ) or (
-            (DIGIT in result) and (NOTDIGIT in result)
-        ):
-            result = random.sample(candidates, count)
-        result = sorted(result, key=lambda x: x.regex)
-        return result
+            count: int, rng: typing.Any = random) -> typing.Tuple[int, ...]:
+        """
+        Generate the indices of distinct set atoms (see `alphabet`),
+        sorted by regex
+        """
+        if count > len(ATOM_REGEX):
+            indices = list(range(len(SET_SPECIAL_CHARS), len(ATOM_REGEX)))
+        else:
+            indices = rng.sample(range(len(ATOM_REGEX)), count)
+            if sum(index < len(SET_SPECIAL_CHARS) for index in indices) > 1:
+                indices = _without_complements(indices, rng)
+        return tuple(sorted(indices, key=ATOM_RANK.__getitem__))
 
     @ staticmethod
-    def _get_random_printables() -> RegexPattern:
-        return random.choice(CharGenerator.printable_escapes)
+    def _get_random_printables(rng: typing.Any = random) -> Chars:
+        return rng.choice(CharGenerator.printable_escapes)
+
+
+def _without_complements(indices: typing.List[int],
+                         rng: typing.Any = random) -> typing.List[int]:
+    """
+    Replace each atom whose complementary atom is drawn before it
+    by an atom drawn among the ones that fit (no re-drawing of the set)
+    """
+    result: typing.List[int] = []
+    for position, index in enumerate(indices):
+        if ATOM_COMPLEMENT[index] in result:
+            excluded = set(result) | set(indices[position + 1:]) | \
+                {ATOM_COMPLEMENT[x] for x in result}
+            allowed = [x for x in range(len(ATOM_REGEX)) if x not in excluded]
+            index = allowed[int(rng.random() * len(allowed))]
+        result.append(index)
+    return result
+
+
+def _build_set(key: typing.Tuple[typing.Tuple[int, ...], bool]) -> Chars:
+    """
+    The Set (or NotSet if negated) pattern of sorted atoms
+    """
+    atoms, negated = key
+    pattern = ''.join([ATOM_REGEX[x] for x in atoms])
+    if negated:
+        mask = 0
+        for x in atoms:
+            mask |= ATOM_MASK[x]
+        return Chars(f'[^{pattern}]', chars_of(ANY_MASK & ~mask))
+    # the members of the atoms, without the repeated ones, in order:
+    return Chars(f'[{pattern}]', tuple(dict.fromkeys(
+        itertools.chain.from_iterable(ATOM_CHARS[x] for x in atoms))))
 
 
 class PatternGenerator:
@@ -252,14 +359,19 @@ class PatternGenerator:
     - [X] Multi,
     - [X] Optional
     """
+    # attempts at building a group fitting the budgets before giving up:
+    budget_retries = 3
 
     def __init__(self, set_complexity: int, union_complexity: int, amount_complexity: int,
                  group_complexity: int, depth_complexity: int, breadth_complexity: int,
-                 special_char_prob: float = 0.5, complex_char_prob: float = 0.5, complex_group_prob: float = 0.5):
+                 special_char_prob: float = 0.5, complex_char_prob: float = 0.5, complex_group_prob: float = 0.5,
+                 lazy_groups: bool = False, backend: str = 'string',
+                 rng: typing.Optional[random.Random] = None):
         assert breadth_complexity >= 1, 'breadth complexity should be larger than 1'
         assert set_complexity >= 1, 'set complexity should be larger than 1'
         assert isinstance(
             complex_group_prob, float) and complex_group_prob >= 0.0 and complex_group_prob <= 1.0, 'complex_group_prob should be a float in range [0, 1]'
+        assert backend in ('regexfactory', 'string'), 'backend should be "regexfactory" or "string"'
         self._set_complexity = set_complexity
         self._union_complexity = union_complexity
         self._amount_complexity = amount_complexity
@@ -267,28 +379,60 @@ class PatternGenerator:
         self._depth_complexity = depth_complexity
         self._breadth_complexity = breadth_complexity
         self._complex_group_prob = complex_group_prob
+        self._lazy_groups = lazy_groups
+        self._backend = backend
+        self._rng: typing.Any = random if rng is None else rng
         self.__char_generator = CharGenerator(
             set_complexity,
             amount_complexity,
             special_char_prob=special_char_prob,
-            complex_char_prob=complex_char_prob
+            complex_char_prob=complex_char_prob,
+            rng=rng
         )
 
-    def get_random_pattern(self, recurse: int = 0) -> RegexPattern:
+    def get_random_pattern(self, recurse: int = 0,
+                           length_budget: typing.Optional[int] = None,
+                           count_budget: typing.Optional[int] = None,
+                           count_floor: int = 1) -> Node:
         """
         Generate random pattern
+
+        With the "string" backend (the default), the regex of the pattern
+        is written straight into a token list. The "regexfactory" backend
+        renders the same regex through regexfactory patterns, with much
+        more object allocation: it is only kept for compatibility and to
+        check the string rendering (`Node.to_pattern()` gives the
+        regexfactory patterns of any node).
+
+        With budgets, the pattern is built constructively: its regex is
+        at most `length_budget` chars long and it matches at most
+        `count_budget` strings, since only the subtrees fitting the
+        remaining budgets are kept. With `count_floor`, the groups are
+        also drawn until the pattern matches at least `count_floor`
+        strings (if they fit the budgets), e.g., the lower bound of
+        the complexity filter of RegexGenerator.
         """
-        group_count = random.randint(1, self._breadth_complexity)
-        groups = self.get_random_groups(group_count, recurse=recurse)
-        pattern = join(*groups)
+        group_count = self._rng.randint(1, self._breadth_complexity)
+        if length_budget is None and count_budget is None and count_floor == 1:
+            groups = self.get_random_groups(group_count, recurse=recurse)
+        else:
+            groups = self._get_budgeted_groups(
+                group_count, recurse,
+                _unbounded(length_budget), _unbounded(count_budget),
+                count_floor)
+        pattern = Concat(groups)
+        if recurse == 0 and self._backend == 'regexfactory':
+            pattern.regex = pattern.to_pattern().regex
         return pattern
 
     def get_random_groups(self, group_count: int,
-                          recurse: int = 0) -> typing.List[Group]:
+                          recurse: int = 0) -> typing.List[Node]:
         """
         Generate random group pattern that includes Or/Amount/Multi/Optional patterns
         """
-        candidates: typing.List[Group] = []
+        if self._lazy_groups:
+            return self._get_random_selected_groups(group_count, recurse=recurse)
+        candidates: typing.List[Node] = []
         weights = []
         while len(candidates) < group_count:
             group = self._get_random_group_pattern(recurse=recurse)
@@ -298,40 +442,181 @@ class PatternGenerator:
             candidates.append(self._get_random_union_groups(recurse=recurse))
             # 2) Limited-Amount-wrapped groups
             candidates.append(
-                Group(
+                Capture(
                     Wrapper.wrap_into_limit_amount(
                         group,
-                        self._amount_complexity)))
+                        self._amount_complexity,
+                        rng=self._rng)))
             # candidates.append(Group(Wrapper.wrap_into_multi(group)))
             # 3) Optional-wrapped groups
-            candidates.append(Group(Optional(group)))
+            candidates.append(Capture(Optional(group)))
             weights.extend([self._complex_group_prob / 3.] * 3)
-        return random.choices(candidates, k=group_count,
-                              weights=tuple(weights))
+        return self._rng.choices(candidates, k=group_count,
+                                 weights=tuple(weights))
+
+    def _get_random_selected_groups(self, group_count: int,
+                                    recurse: int = 0) -> typing.List[Node]:
+        """
+        Lazy version of get_random_groups with the same output distribution.
+
+        The candidates of get_random_groups come in blocks of four:
+        a plain group, an Or-wrapped union,
+        and the Amount/Optional-wrapped plain group of the same block.
+        Here, the candidate indices are selected first, and only the
+        selected candidates (and the plain groups they wrap) are built.
+        """
+        block_count = -(-group_count // 4)
+        weights = (1. - self._complex_group_prob,) + \
+            (self._complex_group_prob / 3.,) * 3
+        selected = self._rng.choices(range(block_count * 4),
+                                     k=group_count,
+                                     weights=weights * block_count)
+        plain_groups: typing.Dict[int, Node] = {}
+        candidates: typing.Dict[int, Node] = {}
+        result = []
+        for index in selected:
+            if index not in candidates:
+                block, kind = divmod(index, 4)
+                if kind == 1:
+                    # 1) Or-wrapped groups
+                    candidates[index] = self._get_random_union_groups(
+                        recurse=recurse)
+                else:
+                    if block not in plain_groups:
+                        plain_groups[block] = self._get_random_group_pattern(
+                            recurse=recurse)
+                    group = plain_groups[block]
+                    if kind == 0:
+                        candidates[index] = group
+                    elif kind == 2:
+                        # 2) Limited-Amount-wrapped groups
+                        candidates[index] = Capture(
+                            Wrapper.wrap_into_limit_amount(
+                                group, self._amount_complexity,
+                                rng=self._rng))
+                    else:
+                        # 3) Optional-wrapped groups
+                        candidates[index] = Capture(Optional(group))
+            result.append(candidates[index])
+        return result
+
+    def _get_budgeted_groups(self, group_count: int, recurse: int,
+                             length_budget: int, count_budget: int,
+                             count_floor: int = 1) -> typing.List[Node]:
+        """
+        Budgeted version of get_random_groups:
+        groups are added while they fit the remaining budgets
+        (the length adds up and the count multiplies along a Concat).
+        The groups have to bring the count up to `count_floor` (the first
+        one that fits, before the others use up the length budget),
+        and up to `budget_retries` more groups are drawn until they do.
+        """
+        groups = []
+        count = 1
+        position = 0
+        while position < group_count or (
+                count < count_floor and
+                position < group_count + self.budget_retries):
+            # the floor left to reach (1 once reached):
+            floor = -(-count_floor // count)
+            position += 1
+            group = self._get_budgeted_group(
+                recurse, length_budget, count_budget, floor)
+            if group is None:
+                continue
+            groups.append(group)
+            length_budget -= len(group.regex)
+            matches = group.count(cap=count_budget)
+            count *= matches
+            count_budget //= matches
+        return groups
+
+    def _get_budgeted_group(self, recurse: int, length_budget: int,
+                            count_budget: int,
+                            count_floor: int = 1) -> typing.Optional[Node]:
+        """
+        One plain/Or/Amount/Optional-wrapped group (weighted as in
+        get_random_groups) fitting the budgets and matching at least
+        `count_floor` strings, None if the attempts fail
+        """
+        weights = (1. - self._complex_group_prob,) + \
+            (self._complex_group_prob / 3.,) * 3
+        for _ in range(self.budget_retries):
+            kind = self._rng.choices(range(4), weights=weights)[0]
+            if kind == 1:
+                # 1) Or-wrapped groups: `((?:a)|(?:b))`, the counts add up
+                groups = []
+                length, count = length_budget - 1, count_budget
+                for _ in range(self._rng.randint(0, self._union_complexity)):
+                    group = self._get_budgeted_group_pattern(
+                        recurse, length - 5, count)
+                    if group is not None:
+                        groups.append(group)
+                        length -= len(group.regex) + 5
+                        count -= group.count(cap=count)
+                group = Capture(Union(groups))
+            else:
+                # the wrappers need at least `(`, `)` and `(?:`, `)?`
+                # (and they match at least as many strings as the group):
+                group = self._get_budgeted_group_pattern(
+                    recurse, length_budget - (0 if kind == 0 else 7),
+                    count_budget, count_floor)
+                if group is None:
+                    continue
+                if kind == 2:
+                    # 2) Limited-Amount-wrapped groups
+                    group = Capture(
+                        Wrapper.wrap_into_limit_amount(
+                            group, self._amount_complexity, rng=self._rng))
+                elif kind == 3:
+                    # 3) Optional-wrapped groups
+                    group = Capture(Optional(group))
+            if _fits(group, length_budget, count_budget, count_floor):
+                return group
+        return None
+
+    def _get_budgeted_group_pattern(self, recurse: int, length_budget: int,
+                                    count_budget: int,
+                                    count_floor: int = 1) -> typing.Optional[Node]:
+        """
+        Budgeted version of _get_random_group_pattern
+        """
+        if length_budget < 2 or count_budget < count_floor:
+            return None
+        if recurse > self._depth_complexity:
+            length = self._rng.randint(0, self._group_complexity)
+            chars = self.__char_generator.get_random_chars(
+                length, length_budget=length_budget - 2,
+                count_budget=count_budget, count_floor=count_floor)
+            return Capture(Concat(chars))
+        else:
+            return Capture(self.get_random_pattern(
+                recurse=recurse + 1, length_budget=length_budget - 2,
+                count_budget=count_budget, count_floor=count_floor))
 
-    def _get_random_union_groups(self, recurse: int = 0) -> Group:
+    def _get_random_union_groups(self, recurse: int = 0) -> Node:
         """
         Get random Or-wrapped group patterns
         """
-        group_count = random.randint(0, self._union_complexity)
+        group_count = self._rng.randint(0, self._union_complexity)
         groups = self._get_random_groups(group_count, recurse=recurse)
-        return Group(Or(*groups))
+        return Capture(Union(groups))
 
     def _get_random_groups(self, group_count: int,
-                           recurse: int = 0) -> typing.List[Group]:
+                           recurse: int = 0) -> typing.List[Node]:
         groups = []
         for _ in range(group_count):
             group = self._get_random_group_pattern(recurse=recurse)
             groups.append(group)
         return groups
 
-    def _get_random_group_pattern(self, recurse: int = 0) -> Group:
+    def _get_random_group_pattern(self, recurse: int = 0) -> Node:
         """
         A string mixing normal chars with special chars
         """
         if recurse > self._depth_complexity:
-            length = random.randint(0, self._group_complexity)
-            return Group(
-                join(*self.__char_generator.get_random_chars(length)))
+            length = self._rng.randint(0, self._group_complexity)
+            chars = self.__char_generator.get_random_chars(length)
+            return Capture(Concat(chars))
         else:
-            return Group(self.get_random_pattern(recurse=recurse + 1))
+            return Capture(self.get_random_pattern(recurse=recurse + 1))
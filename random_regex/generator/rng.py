@@ -0,0 +1,98 @@
+"""
+Random number generator of the pattern generation
+"""
+import random
+import typing
+
+__all__ = ['StreamRandom']
+
+
+class StreamRandom(random.Random):
+    """
+    Counter-based random stream
+
+    The logical dataset is the sequence of candidates 0, 1, 2, ...
+    where candidate `n` draws all its random numbers from a state keyed
+    by (seed, n). Hence, any candidate can be reproduced without
+    generating the ones before it.
+
+    This stream visits the candidates offset, offset + stride,
+    offset + 2 * stride, ..., so that shards made by `shard` cover
+    disjoint slices of the same logical dataset.
+
+    Args:
+        - seed: non-negative int (drawn from os entropy if None)
+        - offset: first candidate of the stream
+        - stride: step between two candidates of the stream
+    """
+
+    def __init__(self, seed: typing.Optional[int] = None,
+                 offset: int = 0, stride: int = 1):
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(64)
+        assert isinstance(seed, int) and seed >= 0, 'seed should be a non-negative int'
+        assert isinstance(offset, int) and offset >= 0, 'offset should be >= 0'
+        assert isinstance(stride, int) and stride > 0, 'stride should be > 0'
+        self.stream_seed = seed
+        self.offset = offset
+        self.stride = stride
+        self.position = 0
+        super().__init__(self._key(offset))
+
+    def _key(self, candidate: int) -> int:
+        return (self.stream_seed << 64) | candidate
+
+    @property
+    def candidate(self) -> int:
+        """
+        Index (in the logical dataset) of the next candidate
+        """
+        return self.offset + self.position * self.stride
+
+    def seek(self, position: int) -> None:
+        """
+        Jump to the `position`-th candidate of this stream
+        """
+        assert position >= 0, 'position should be >= 0'
+        self.position = position
+
+    def advance(self) -> int:
+        """
+        Start the next candidate: reset the state to its key
+        and return its index in the logical dataset
+        """
+        candidate = self.candidate
+        super().seed(self._key(candidate))
+        self.position += 1
+        return candidate
+
+    def shard(self, index: int, count: int) -> 'StreamRandom':
+        """
+        The `index`-th of `count` disjoint sub-streams
+        covering the remaining candidates of this stream
+        """
+        assert 0 <= index < count, 'index should be in range [0, count)'
+        return StreamRandom(self.stream_seed,
+                            offset=self.candidate + index * self.stride,
+                            stride=self.stride * count)
+
+    def to_dict(self) -> dict:
+        """
+        Position of this stream, enough to resume it:
+        StreamRandom(seed, offset, stride).seek(position)
+        """
+        return {
+            'seed': self.stream_seed,
+            'offset': self.offset,
+            'stride': self.stride,
+            'position': self.position
+        }
+
+    def getstate(self):
+        return (super().getstate(), self.stream_seed,
+                self.offset, self.stride, self.position)
+
+    def setstate(self, state):
+        base_state, self.stream_seed, self.offset, self.stride, \
+            self.position = state
+        super().setstate(base_state)
@@ -0,0 +1,127 @@
+"""
+Per-stage instrumentation of the regex generation pipeline
+"""
+import time
+import typing
+from collections import deque
+
+__all__ = ['GenerationStats']
+
+
+class StageStats:
+    """
+    Counters of one pipeline stage
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.rejected = 0
+        self.seconds = 0.
+
+    def to_dict(self) -> dict:
+        return {
+            'calls': self.calls,
+            'rejected': self.rejected,
+            'seconds': self.seconds
+        }
+
+
+class GenerationStats:
+    """
+    Counters, cumulative time and latency of the generation pipeline
+
+    Stages are instrumented by wrapping their functions
+    (see `timed` and `checked`), and accepted results are reported
+    through `accept`. The latency of an accepted regex is the time spent
+    in the pipeline since the previous accepted one
+    (the time spent by the consumer is excluded).
+
+    Args:
+        - window: number of the latest latencies kept for the percentiles
+    """
+
+    def __init__(self, window: int = 10000):
+        self.stages: typing.Dict[str, StageStats] = {}
+        self.accepted = 0
+        self._latencies: typing.Deque[float] = deque(maxlen=window)
+        self._started = time.perf_counter()
+        self._mark = self._started
+
+    def _stage(self, name: str) -> StageStats:
+        if name not in self.stages:
+            self.stages[name] = StageStats()
+        return self.stages[name]
+
+    def timed(self, name: str, func: typing.Callable) -> typing.Callable:
+        """
+        Wrap a map-stage function to count its calls and time
+        """
+        stage = self._stage(name)
+
+        def wrapped(*args):
+            start = time.perf_counter()
+            result = func(*args)
+            stage.seconds += time.perf_counter() - start
+            stage.calls += 1
+            return result
+        return wrapped
+
+    def checked(self, name: str, predicate: typing.Callable) -> typing.Callable:
+        """
+        Wrap a filter-stage predicate to count its calls, rejections and time
+        """
+        stage = self._stage(name)
+
+        def wrapped(x):
+            start = time.perf_counter()
+            result = predicate(x)
+            stage.seconds += time.perf_counter() - start
+            stage.calls += 1
+            if not result:
+                stage.rejected += 1
+            return result
+        return wrapped
+
+    def accept(self) -> None:
+        """
+        Record an accepted result (called right before it is yielded)
+        """
+        self.accepted += 1
+        self._latencies.append(time.perf_counter() - self._mark)
+
+    def resume(self) -> None:
+        """
+        Mark the pipeline resuming after yielding a result
+        """
+        self._mark = time.perf_counter()
+
+    def latency(self, percentile: float) -> float:
+        """
+        Latency percentile (in seconds) over the latest accepted regex
+        """
+        if not self._latencies:
+            return 0.
+        latencies = sorted(self._latencies)
+        index = min(int(len(latencies) * percentile / 100.),
+                    len(latencies) - 1)
+        return latencies[index]
+
+    def snapshot(self) -> dict:
+        """
+        JSON-able snapshot of all the counters
+        """
+        candidates = self.stages['produce'].calls \
+            if 'produce' in self.stages else 0
+        return {
+            'elapsed': time.perf_counter() - self._started,
+            'candidates': candidates,
+            'accepted': self.accepted,
+            'acceptance_rate': self.accepted / candidates if candidates else 0.,
+            'latency': {
+                'p50': self.latency(50),
+                'p99': self.latency(99)
+            },
+            'stages': {
+                name: stage.to_dict() for name, stage in self.stages.items()
+            }
+        }
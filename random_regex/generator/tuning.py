@@ -0,0 +1,139 @@
+"""
+Adaptive tuning of the PatternGenerator parameters
+
+The tuner treats each setting of a small search space (around the
+static defaults) as an arm of a multi-armed bandit. The generation
+runs in epochs of `epoch` candidates: each epoch uses one setting and
+its yield (emitted regex per second, the repeats excluded) updates
+that setting's score.
+The next setting is the best one so far (epsilon-greedy), after each
+setting has been tried once.
+"""
+import itertools
+import random
+import time
+import typing
+
+__all__ = ['AdaptiveTuner']
+
+SEARCH_SPACE = {
+    'group_complexity': (2, 4, 6, 10),
+    'breadth_complexity': (1, 2, 3),
+    'amount_complexity': (2, 4)
+}
+
+
+class AdaptiveTuner:
+    """
+    Epsilon-greedy search of the PatternGenerator parameters
+    maximizing the accepted regex per second
+
+    Args:
+        - base: the static parameters (the first setting tried)
+        - search_space: candidate values of the tuned parameters
+        - epoch: number of candidates generated with one setting
+        - epsilon: probability of trying a random setting after an epoch
+        - seed: seed of the exploration
+    """
+
+    def __init__(self, base: dict,
+                 search_space: typing.Optional[typing.Dict[str, tuple]] = None,
+                 epoch: int = 500, epsilon: float = 0.1,
+                 seed: typing.Optional[int] = None):
+        assert isinstance(epoch, int) and epoch > 0, 'epoch should be > 0'
+        assert 0.0 <= epsilon <= 1.0, 'epsilon should be in range [0, 1]'
+        search_space = SEARCH_SPACE if search_space is None else search_space
+        keys = list(search_space)
+        self.settings = [dict(base)] + [
+            dict(base, **dict(zip(keys, values)))
+            for values in itertools.product(*search_space.values())
+            if any(base[key] != value for key, value in zip(keys, values))
+        ]
+        self._epoch = epoch
+        self._epsilon = epsilon
+        self._random = random.Random(seed)
+        self._accepted = [0] * len(self.settings)
+        self._seconds = [0.] * len(self.settings)
+        self._epochs = [0] * len(self.settings)
+        self.arm = 0
+        self._candidates = 0
+        self._epoch_accepted = 0
+        self._epoch_start: typing.Optional[float] = None
+
+    def step(self) -> int:
+        """
+        Record a new candidate and return the index of its setting
+        """
+        if self._epoch_start is None:
+            self._epoch_start = time.perf_counter()
+        elif self._candidates >= self._epoch:
+            self._end_epoch()
+        self._candidates += 1
+        return self.arm
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # the timing of the current epoch does not carry over, restart it:
+        state.update(_candidates=0, _epoch_accepted=0, _epoch_start=None)
+        return state
+
+    def accept(self, result: dict) -> dict:
+        """
+        Record an emitted result (after the repeat filter)
+        """
+        self._epoch_accepted += 1
+        return result
+
+    def _end_epoch(self) -> None:
+        assert self._epoch_start is not None, 'the epoch should be started'
+        now = time.perf_counter()
+        self._accepted[self.arm] += self._epoch_accepted
+        self._seconds[self.arm] += now - self._epoch_start
+        self._epochs[self.arm] += 1
+        self.arm = self._select()
+        self._candidates = 0
+        self._epoch_accepted = 0
+        self._epoch_start = now
+
+    def _select(self) -> int:
+        untried = [arm for arm, epochs in enumerate(self._epochs) if epochs == 0]
+        if untried:
+            return untried[0]
+        if self._random.random() < self._epsilon:
+            return self._random.randrange(len(self.settings))
+        return self.best
+
+    def score(self, arm: int) -> float:
+        """
+        Accepted regex per second of a setting
+        """
+        seconds = self._seconds[arm]
+        return self._accepted[arm] / seconds if seconds else 0.
+
+    @property
+    def best(self) -> int:
+        """
+        Index of the setting with the best score so far
+        """
+        return max(range(len(self.settings)), key=self.score)
+
+    def info(self) -> dict:
+        """
+        Snapshot of the search: the best setting so far and
+        the score of all tried settings
+        """
+        return {
+            'arm': self.arm,
+            'best': self.settings[self.best],
+            'best_score': self.score(self.best),
+            'settings': [
+                {
+                    'setting': setting,
+                    'epochs': self._epochs[arm],
+                    'accepted': self._accepted[arm],
+                    'seconds': self._seconds[arm],
+                    'score': self.score(arm)
+                } for arm, setting in enumerate(self.settings)
+                if self._epochs[arm]
+            ]
+        }
@@ -0,0 +1,156 @@
+"""
+Streaming writer of generated regex into rotated dataset shards
+
+Supported formats:
+- jsonl: gzip-compressed JSON lines (part-00000.jsonl.gz, ...)
+- parquet: columnar Parquet files (part-00000.parquet, ...), requires pyarrow
+
+Each shard comes with a part-xxxxx.meta.json file recording its record count,
+the generator parameters and the random stream state at the end of the shard.
+"""
+import gzip
+import json
+import os
+import typing
+
+__all__ = ['ShardWriter']
+
+FORMATS = ('jsonl', 'parquet')
+
+
+class ShardWriter:
+    """
+    Write results into shards of at most `shard_size` records.
+
+    Records are buffered and written `buffer_size` at a time,
+    so the memory usage stays bounded by the buffer.
+
+    Args:
+        - directory: output directory (created if missing)
+        - shard_size: number of records per shard
+        - fmt: 'jsonl' or 'parquet'
+        - buffer_size: number of records written at once
+        - metadata: callable returning the metadata (a JSON-able dict)
+            recorded along with each shard, e.g., generator parameters
+            and random stream state
+        - start_index: index of the first shard, e.g., to resume a run
+        - on_shard: called once each shard and its metadata are
+            synced to disk, e.g., to commit a MmapDedupStore
+    """
+
+    def __init__(self, directory: str, shard_size: int = 100000,
+                 fmt: str = 'jsonl', buffer_size: int = 1000,
+                 metadata: typing.Optional[typing.Callable[[], dict]] = None,
+                 start_index: int = 0,
+                 on_shard: typing.Optional[typing.Callable[[], object]] = None):
+        assert fmt in FORMATS, f'fmt should be one of {FORMATS}'
+        assert isinstance(shard_size, int) and shard_size > 0, 'shard_size should be > 0'
+        assert isinstance(buffer_size, int) and buffer_size > 0, 'buffer_size should be > 0'
+        self._directory = directory
+        self._shard_size = shard_size
+        self._fmt = fmt
+        self._buffer_size = min(buffer_size, shard_size)
+        self._metadata = metadata
+        self._on_shard = on_shard
+        self._buffer: typing.List[dict] = []
+        self._shard_index = start_index
+        self._shard_records = 0
+        self._file: typing.Any = None
+        self.paths: typing.List[str] = []
+        if fmt == 'parquet':
+            import pyarrow
+            import pyarrow.parquet
+            self._pa = pyarrow
+            self._pq = pyarrow.parquet
+            self._schema = pyarrow.schema([
+                ('regex', pyarrow.string()),
+                ('complexity', pyarrow.int64()),
+                ('length', pyarrow.int64()),
+                ('examples', pyarrow.list_(pyarrow.string()))
+            ])
+        os.makedirs(directory, exist_ok=True)
+
+    def __enter__(self) -> 'ShardWriter':
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is not None:
+            # the results yielded but not written are not committed:
+            self._on_shard = None
+        self.close()
+
+    def write(self, result: dict) -> None:
+        """
+        Add one result (a dict yielded by RegexGenerator.generate)
+        """
+        self._buffer.append(result)
+        if self._shard_records + len(self._buffer) >= self._shard_size:
+            self._flush()
+            self._close_shard()
+        elif len(self._buffer) >= self._buffer_size:
+            self._flush()
+
+    def close(self) -> None:
+        """
+        Flush the buffer and close the current shard
+        """
+        if self._buffer:
+            self._flush()
+        if self._file is not None:
+            self._close_shard()
+
+    def _path(self, suffix: str) -> str:
+        return os.path.join(self._directory,
+                            f'part-{self._shard_index:05d}{suffix}')
+
+    def _flush(self) -> None:
+        if self._file is None:
+            self._open_shard()
+        if self._fmt == 'jsonl':
+            self._file.write(''.join([
+                json.dumps({
+                    'regex': x['regex'],
+                    'complexity': x['complexity'],
+                    'length': x['length'],
+                    'examples': list(x['examples'])
+                }) + '\n' for x in self._buffer]))
+        else:
+            self._file.write_table(self._pa.Table.from_pydict({
+                'regex': [x['regex'] for x in self._buffer],
+                'complexity': [x['complexity'] for x in self._buffer],
+                'length': [x['length'] for x in self._buffer],
+                'examples': [list(x['examples']) for x in self._buffer]
+            }, schema=self._schema))
+        self._shard_records += len(self._buffer)
+        self._buffer = []
+
+    def _open_shard(self) -> None:
+        if self._fmt == 'jsonl':
+            path = self._path('.jsonl.gz')
+            self._file = gzip.open(path, 'wt', encoding='utf-8')
+        else:
+            path = self._path('.parquet')
+            self._file = self._pq.ParquetWriter(
+                path, self._schema, compression='zstd')
+        self.paths.append(path)
+
+    def _close_shard(self) -> None:
+        self._file.close()
+        self._file = None
+        _fsync(self.paths[-1])
+        meta = {'records': self._shard_records, 'format': self._fmt}
+        if self._metadata is not None:
+            meta.update(self._metadata())
+        with open(self._path('.meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        self._shard_index += 1
+        self._shard_records = 0
+        if self._on_shard is not None:
+            self._on_shard()
+
+
+def _fsync(path: str) -> None:
+    with open(path, 'rb') as f:
+        os.fsync(f.fileno())
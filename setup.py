@@ -51,9 +51,14 @@ setuptools.setup(
         "Operating System :: OS Independent",
 
     ],
+    entry_points={
+        'console_scripts': ['random-regex=random_regex.cli:main']
+    },
+    extras_require={
+        'parquet': ['pyarrow']
+    },
     python_requires='>=3.8, !=3.11.*',
     install_requires=[
-        'exrex==0.11.0',
         'toolz==0.12.0',
         'regexfactory==1.0.0',
         'pybloom3'
@@ -0,0 +1,39 @@
+import functools
+from itertools import islice
+import pytest
+from random_regex import RegexGenerator
+from random_regex.generator.checkpoint import Checkpoint, stable_hash
+from random_regex.generator.dedup import MmapDedupStore
+
+
+def regexes(results, n):
+    return [x['regex'] for x in islice(results, n)]
+
+
+def test_resume(tmp_path):
+    import rbloom
+    backends = {
+        'pybloom': lambda name: None,
+        'rbloom': lambda name: functools.partial(rbloom.Bloom, hash_func=stable_hash),
+        'store': lambda name: functools.partial(
+            MmapDedupStore, path=str(tmp_path / f'{name}.dedup'))
+    }
+    for key, bloom_cls in backends.items():
+        expected = regexes(RegexGenerator(
+            seed=3, bloom_cls=bloom_cls(f'{key}-ref')).generate(), 50)
+        checkpoint = Checkpoint(str(tmp_path / f'{key}.ckpt'), every=10)
+        regex_generator = RegexGenerator(seed=3, bloom_cls=bloom_cls(key))
+        # stopped 7 results after its third checkpoint:
+        output = regexes(regex_generator.generate(checkpoint=checkpoint), 37)
+        assert checkpoint.saves == 3 and output == expected[:37]
+        resumed = checkpoint.load()
+        assert resumed.emitted == 30
+        output = output[:30] + regexes(resumed.generate(checkpoint=checkpoint), 20)
+        assert output == expected, key
+
+
+def test_builtin_hash_rbloom(tmp_path):
+    import rbloom
+    regex_generator = RegexGenerator(bloom_cls=rbloom.Bloom)
+    with pytest.raises(ValueError):
+        Checkpoint(str(tmp_path / 'run.ckpt')).save(regex_generator)
@@ -0,0 +1,83 @@
+import functools
+import pickle
+from random_regex import RegexGenerator
+from random_regex.generator.dedup import MmapDedupStore, SharedDedupFilter
+
+
+def test_add_grow_and_reopen(tmp_path):
+    path = str(tmp_path / 'seen.dedup')
+    store = MmapDedupStore(100, 0.001, path=path)
+    items = [f'({i})' for i in range(3000)]
+    for item in items:
+        assert not store.add(item)
+    assert store.add(items[0])
+    assert len(store) == 3000
+    assert all(item in store for item in items)
+    assert not any(f'[{i}]' in store for i in range(3000))
+    reader = MmapDedupStore(path=path, mode='r')
+    assert len(reader) == 3000 and items[-1] in reader
+    store.add('new')
+    assert 'new' in reader
+    store.close()
+    reopened = pickle.loads(pickle.dumps(MmapDedupStore(path=path)))
+    assert len(reopened) == 3001 and 'new' in reopened
+
+
+def test_no_repeat_across_runs(tmp_path):
+    bloom_cls = functools.partial(MmapDedupStore, path=str(tmp_path / 'seen.dedup'))
+    regexes = []
+    for _ in range(2):
+        regex_generator = RegexGenerator(bloom_cls=bloom_cls, seed=0).generate()
+        regexes.extend(next(regex_generator)['regex'] for _ in range(10))
+    assert len(set(regexes)) == 20
+
+
+def test_commit_and_rollback(tmp_path):
+    path = str(tmp_path / 'seen.dedup')
+    store = MmapDedupStore(100, path=path)
+    for i in range(300):
+        store.add(f'a{i}')
+    commits = store.commit()
+    # enough items to grow the table after the commit:
+    for i in range(2000):
+        store.add(f'b{i}')
+    store.close()
+    store = MmapDedupStore(path=path)
+    store.rollback(commits)
+    assert len(store) == 300 and store.commits == commits
+    assert all(f'a{i}' in store for i in range(300))
+    assert not any(f'b{i}' in store for i in range(2000))
+    # stopped between a checkpoint and its commit: nothing to roll back
+    store.add('c')
+    store.rollback(commits + 1)
+    assert 'c' in store and store.commits == commits + 1
+
+
+def _generate_shared(name, queue):
+    bloom_cls = functools.partial(SharedDedupFilter, name=name)
+    results = RegexGenerator(bloom_cls=bloom_cls, item_count=1000, seed=0).generate()
+    queue.put([next(results)['regex'] for _ in range(10)])
+
+
+def test_shared_filter_across_processes():
+    import multiprocessing
+    import os
+    name = f'random-regex-test-{os.getpid()}'
+    shared = SharedDedupFilter(1000, name=name)
+    try:
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+        # the same seed: each process only emits the regex the others did not
+        processes = [context.Process(target=_generate_shared, args=(name, queue))
+                     for _ in range(2)]
+        for process in processes:
+            process.start()
+        regexes = queue.get(timeout=60) + queue.get(timeout=60)
+        for process in processes:
+            process.join()
+        assert len(set(regexes)) == 20 and len(shared) == 20
+        assert all(regex in shared for regex in regexes)
+        assert pickle.loads(pickle.dumps(shared)).add(regexes[0])
+    finally:
+        shared.close()
+        shared.unlink()
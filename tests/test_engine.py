@@ -0,0 +1,145 @@
+import re
+import random
+import exrex
+from random_regex.generator.random_pattern import PatternGenerator
+from random_regex import RegexGenerator
+
+
+def test_count_and_expand():
+    random.seed(0)
+    pattern_generator = PatternGenerator(
+        **RegexGenerator().initial_complexities)
+    for _ in range(300):
+        pattern = pattern_generator.get_random_pattern()
+        complexity = pattern.count(cap=1000)
+        if complexity >= 1000:
+            continue
+        examples = list(pattern.expand())
+        assert len(examples) == complexity
+        re_com = re.compile(pattern.regex)
+        for ex in examples:
+            assert re_com.fullmatch(ex) is not None
+        assert re_com.fullmatch(pattern.sample()) is not None
+
+
+def test_sample_skips_empty_sets():
+    from random_regex.generator.engine import Chars, Concat, Capture, Optional, Union
+    from random_regex.generator.random_pattern import _build_set
+    from random_regex.generator.alphabet import ATOM_REGEX
+    empty = _build_set((tuple(ATOM_REGEX.index(x) for x in ('\\S', '\\W')), True))
+    assert empty.regex == '[^\\S\\W]' and empty.count() == 0
+    pattern = Concat([Capture(Chars('[abc]', 'abc')),
+                      Capture(Optional(Capture(empty)))])
+    assert pattern.regex == '([abc])((?:([^\\S\\W]))?)' and pattern.count() == 3
+    re_com = re.compile(pattern.regex)
+    rng = random.Random(0)
+    for _ in range(20):
+        assert re_com.fullmatch(pattern.sample(rng))
+    union = Union([empty, Chars('a', 'a')])
+    assert all(union.sample(rng) == 'a' for _ in range(20))
+
+
+def test_memo_expand():
+    from random_regex.generator.memo import SubpatternMemo
+    random.seed(0)
+    pattern_generator = PatternGenerator(
+        **RegexGenerator().initial_complexities)
+    memo = SubpatternMemo(maxsize=64, min_strings=1)
+    for _ in range(300):
+        pattern = pattern_generator.get_random_pattern()
+        if pattern.count(cap=1000) >= 1000:
+            continue
+        assert list(pattern.expand(memo)) == list(pattern.expand())
+    assert memo.info()['hits'] > 0
+
+
+def test_same_examples_as_exrex():
+    random.seed(0)
+    pattern_generator = PatternGenerator(
+        **RegexGenerator().initial_complexities)
+    for _ in range(300):
+        pattern = pattern_generator.get_random_pattern()
+        regex = pattern.regex
+        if pattern.count(cap=100) >= 100 or '\\S' in regex or '\\D' in regex:
+            continue
+        try:
+            expected = list(exrex.generate(regex))
+        except TypeError:
+            # exrex fails on some nested groups
+            continue
+        if not all(isinstance(ex, str) for ex in expected) or \
+                len(set(expected)) != exrex.count(regex):
+            continue
+        assert list(pattern.expand()) == expected
+
+
+def test_backends_render_same_regex():
+    patterns = {}
+    for backend in ('regexfactory', 'string'):
+        pattern_generator = PatternGenerator(
+            **RegexGenerator().initial_complexities, backend=backend)
+        random.seed(0)
+        patterns[backend] = [
+            pattern_generator.get_random_pattern().regex for _ in range(300)]
+    assert patterns['regexfactory'] == patterns['string']
+
+
+def test_canonicalize():
+    from random_regex.generator.canonical import canonicalize
+    from random_regex.generator.engine import (
+        Chars, Concat, Capture, Union, Repeat, Optional, CATEGORY_CHARS)
+    space = Chars('\\s', CATEGORY_CHARS['\\s'])
+    pattern = Concat([Capture(Capture(space)), Capture(Capture(space))])
+    assert canonicalize(pattern).regex == '\\s\\s'
+    group = Concat([Chars('D', 'D'), Chars('2', '2'), Chars('[Qh]', 'Qh')])
+    pattern = Concat([Capture(Capture(Optional(Capture(group))))])
+    assert canonicalize(pattern).regex == '(D2[Qh])?'
+    empty = Capture(Concat([]))
+    pattern = Concat([Capture(empty), Capture(Repeat(Capture(empty), 4, 7))])
+    assert canonicalize(pattern).regex == ''
+    pattern = Capture(Union([Chars('[ca-b]', 'cab'), Chars('[a-a]', 'a'),
+                             Chars('[a-a]', 'a')]))
+    canonical = canonicalize(pattern)
+    assert canonical.regex == '[a-c]|a' and canonical.count() == 4
+    digits = Chars('[0123456789]', '0123456789')
+    assert canonicalize(digits).regex == '[0-9]'
+    assert not re.fullmatch(canonicalize(digits).regex, '\u0663')
+
+    random.seed(0)
+    pattern_generator = PatternGenerator(
+        **RegexGenerator().initial_complexities)
+    for _ in range(300):
+        pattern = pattern_generator.get_random_pattern()
+        canonical = canonicalize(pattern)
+        assert len(canonical.regex) <= len(pattern.regex)
+        if pattern.count(cap=1000) >= 1000:
+            continue
+        examples = list(canonical.expand())
+        assert set(examples) == set(pattern.expand())
+        assert len(examples) == canonical.count()
+        re_com = re.compile(canonical.regex)
+        original = re.compile(pattern.regex)
+        for ex in examples:
+            assert re_com.fullmatch(ex) is not None
+            # the same strings match, the non-ASCII digits included:
+            ex = re.sub('[0-9]', '\u0663', ex)
+            assert bool(re_com.fullmatch(ex)) == bool(original.fullmatch(ex))
+
+
+def test_unrank_and_sample_uniform():
+    random.seed(0)
+    pattern_generator = PatternGenerator(
+        **RegexGenerator().initial_complexities)
+    for _ in range(300):
+        pattern = pattern_generator.get_random_pattern()
+        size = pattern.count()
+        assert pattern.size() == size
+        if size < 1000:
+            assert [pattern.unrank(i) for i in range(size)] == list(pattern.expand())
+        samples = pattern.sample_uniform(10)
+        assert len(set(samples)) == len(samples) <= 10
+        if size <= 10:
+            assert samples == list(dict.fromkeys(pattern.expand()))
+        re_com = re.compile(pattern.regex)
+        for ex in samples:
+            assert re_com.fullmatch(ex) is not None
@@ -1,4 +1,5 @@
 import re
+from itertools import islice
 from random_regex import RegexGenerator
 import pickle
 import os
@@ -43,3 +44,335 @@ def test_pickle(bloom_cls):
         with open('regex_generator.pkl', 'wb') as f:
             pickle.dump(regex_generator, f)
     os.remove('regex_generator.pkl')
+
+
+def test_generate_parallel():
+    from random_regex.generator.parallel import ParallelProducer, WorkerError
+    regex_generator = RegexGenerator(seed=0)
+    results = regex_generator.generate(workers=2, batch_size=4)
+    regexes = [next(results)['regex'] for _ in range(20)]
+    results.close()
+    assert len(set(regexes)) == len(regexes)
+    # the stream is moved past the candidates drawn by the workers:
+    assert regex_generator.rng.position >= 20
+    # a failing worker raises in the parent instead of blocking it:
+    producer = ParallelProducer(dict(regex_generator._config, unknown=None),
+                                2, regex_generator.rng)
+    with pytest.raises(WorkerError, match='unknown'):
+        next(iter(producer))
+
+
+def test_regex_cache():
+    regex_generator = RegexGenerator(regex_cache_size=8)
+    instance = next(regex_generator.generate())
+    info = regex_generator.regex_cache.info()
+    assert info['misses'] >= 1
+    assert info['size'] <= 8
+    assert regex_generator._compile(instance['regex']).fullmatch(instance['examples'][0])
+    assert regex_generator.regex_cache.info()['hits'] == info['hits'] + 1
+
+
+def test_seed():
+    regexes = []
+    for _ in range(2):
+        regex_generator = RegexGenerator(seed=0).generate()
+        regexes.append([next(regex_generator)['regex'] for _ in range(5)])
+    assert regexes[0] == regexes[1]
+
+
+def test_stream_shards_and_seek():
+    from random_regex.generator.rng import StreamRandom
+    producer = RegexGenerator(seed=1).regex_producer()
+    expected = [next(producer)['regex'] for _ in range(6)]
+    rng = StreamRandom(1)
+    shards = [RegexGenerator(rng=rng.shard(i, 2)).regex_producer()
+              for i in range(2)]
+    assert [next(shards[i % 2])['regex'] for i in range(6)] == expected
+    rng = StreamRandom(1)
+    rng.seek(4)
+    assert next(RegexGenerator(rng=rng).regex_producer())['regex'] == expected[4]
+
+
+def test_stats():
+    regex_generator = RegexGenerator(seed=0)
+    generate = regex_generator.generate()
+    for _ in range(5):
+        next(generate)
+    snapshot = regex_generator.stats.snapshot()
+    assert snapshot['accepted'] == 5
+    assert snapshot['candidates'] == snapshot['stages']['length']['calls']
+    assert 0 < snapshot['acceptance_rate'] <= 1
+    assert snapshot['latency']['p50'] <= snapshot['latency']['p99']
+    stages = snapshot['stages']
+    assert stages['count']['calls'] == \
+        stages['length']['calls'] - stages['length']['rejected']
+    assert stages['repeat']['calls'] - stages['repeat']['rejected'] == 5
+    assert RegexGenerator(stats=False).stats is None
+
+
+def test_adaptive():
+    regex_generator = RegexGenerator(
+        max_length=12, max_complexity=100, adaptive=True, seed=0)
+    generate = regex_generator.generate()
+    for _ in range(50):
+        instance = next(generate)
+        assert instance['length'] < 12
+        assert len(instance['examples']) == instance['complexity'] < 100
+    info = regex_generator.tuner.info()
+    assert info['settings'] and info['best'] in regex_generator.tuner.settings
+    assert RegexGenerator().tuner is None
+
+
+def test_adaptive_tuner_selection():
+    from random_regex.generator.tuning import AdaptiveTuner
+    tuner = AdaptiveTuner({'a': 0}, search_space={'a': (0, 1, 2)},
+                          epoch=1, epsilon=0.)
+    assert len(tuner.settings) == 3
+    arms = [tuner.step() for _ in range(3)]
+    assert arms == [0, 1, 2]
+    tuner._accepted, tuner._seconds = [1, 5, 2], [1., 1., 1.]
+    assert tuner.step() == 1
+
+
+def test_adaptive_tuner_ignores_repeats():
+    from random_regex.generator.tuning import AdaptiveTuner
+    regex_generator = RegexGenerator(adaptive=True, seed=0)
+    tuner = regex_generator._tuner = AdaptiveTuner(
+        {'a': 0}, search_space={'a': (0, 1)}, epoch=50, epsilon=0.)
+
+    def candidates():
+        # setting 0 only yields repeats of the same regex
+        for index in range(100000):
+            arm = tuner.step()
+            yield {'regex': 'a' if arm == 0 else f'b{index}'}
+    for _ in islice(regex_generator._filter_repeat(candidates()), 500):
+        pass
+    assert tuner._accepted[0] == 1
+    assert tuner.best == 1 and tuner.arm == 1
+
+
+def test_constrained():
+    from random_regex.generator.random_pattern import PatternGenerator
+    from random_regex.generator.rng import StreamRandom
+    pattern_generator = PatternGenerator(
+        **dict(RegexGenerator().initial_complexities, depth_complexity=1),
+        backend='string', rng=StreamRandom(0))
+    for _ in range(200):
+        pattern = pattern_generator.get_random_pattern(
+            length_budget=15, count_budget=50)
+        assert len(pattern.regex) <= 15
+        assert pattern.count(cap=51) <= 50
+    regex_generator = RegexGenerator(
+        max_length=10, max_complexity=50, constrained=True, seed=0)
+    generate = regex_generator.generate()
+    for _ in range(20):
+        instance = next(generate)
+        assert instance['length'] < 10 and instance['complexity'] < 50
+    # the count floor keeps nearly all candidates within the complexity filter:
+    stages = regex_generator.stats.snapshot()['stages']
+    assert stages['complexity']['rejected'] <= 0.01 * stages['complexity']['calls']
+    for _ in range(200):
+        pattern = pattern_generator.get_random_pattern(
+            length_budget=7, count_budget=99, count_floor=3)
+        assert 3 <= pattern.count(cap=100) <= 99 and len(pattern.regex) <= 7
+
+
+def test_char_generator_sets():
+    from random_regex.generator.random_pattern import CharGenerator
+    from random_regex.generator.rng import StreamRandom
+    char_generator = CharGenerator(4, 4, rng=StreamRandom(0))
+    for _ in range(500):
+        chars = char_generator._get_random_set()
+        for special in ('\\s', '\\w', '\\d'):
+            assert not (special in chars.regex and special.upper() in chars.regex)
+        compiled = re.compile(chars.regex)
+        assert chars.count() > 0
+        assert len(set(chars.chars)) == chars.count()
+        assert all(compiled.fullmatch(c) for c in chars.chars)
+        if chars.regex.startswith('[^'):
+            # a NotSet holds all the matching chars of the `.` universe
+            assert chars.count() == sum(
+                1 for x in range(32, 123) if compiled.fullmatch(chr(x)))
+
+
+def test_canonical():
+    regex_generator = RegexGenerator(max_length=12, canonical=True, seed=0)
+    generate = regex_generator.generate()
+    for _ in range(20):
+        instance = next(generate)
+        assert instance['length'] < 12
+        assert '(?:' not in instance['regex']
+        assert len(instance['examples']) == instance['complexity']
+
+
+def test_agenerate():
+    import asyncio
+
+    async def consume():
+        regex_generator = RegexGenerator(seed=0)
+        results = regex_generator.agenerate(prefetch=4, batch_size=2)
+        regexes = []
+        async for instance in results:
+            regexes.append(instance['regex'])
+            if len(regexes) == 10:
+                break
+        await results.aclose()
+        await asyncio.sleep(0.2)
+        # the production pauses when the prefetch buffer is full:
+        assert regex_generator.stats.accepted <= 10 + 4 + 2
+        return regexes
+
+    regexes = asyncio.run(consume())
+    generate = RegexGenerator(seed=0).generate()
+    assert regexes == [next(generate)['regex'] for _ in range(10)]
+
+
+def test_agenerate_cancel():
+    import asyncio
+
+    async def consume(results):
+        async for _ in results:
+            pass
+
+    async def cancel():
+        task = asyncio.ensure_future(consume(RegexGenerator().agenerate()))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            return True
+        return False
+
+    assert asyncio.run(cancel())
+
+
+def test_generate_batch():
+    from random_regex.generator.examples import PackedExamples
+    regex_generator = RegexGenerator(seed=0)
+    batches = [regex_generator.generate_batch(5), regex_generator.generate_batch(3)]
+    generate = RegexGenerator(seed=0).generate()
+    expected = [next(generate) for _ in range(8)]
+    results = [batch[i] for batch in batches for i in range(len(batch))]
+    assert results == expected
+    batch = batches[0]
+    assert list(batch.length) == [len(x) for x in batch.regex]
+    assert batch.example_offsets[-1] == len(batch.examples) == sum(batch.complexity)
+    assert isinstance(batch.examples, PackedExamples)
+    pickle.loads(pickle.dumps(regex_generator))
+    # the packed examples of the results are copied buffer-wise:
+    packed = RegexGenerator(seed=0, packed_examples=True).generate_batch(8)
+    assert packed.examples == PackedExamples.concat(batch.examples for batch in batches)
+
+
+def test_generate_batch_to_arrow():
+    pyarrow = pytest.importorskip('pyarrow')
+    batch = RegexGenerator(seed=0).generate_batch(4)
+    table = batch.to_arrow()
+    assert table.column('regex').to_pylist() == batch.regex
+    assert table.column('examples').to_pylist() == [batch[i]['examples'] for i in range(4)]
+    assert table.column('examples').chunk(0).values.buffers()[2].address == \
+        pyarrow.py_buffer(batch.examples.data).address
+
+
+def test_sample_size():
+    from random_regex.generator.engine import Chars, Union
+    regex_generator = RegexGenerator(
+        max_complexity=10 ** 7, max_length=30, sample_size=5, seed=0)
+    generate = regex_generator.generate()
+    for _ in range(20):
+        instance = next(generate)
+        assert 1 <= len(instance['examples']) <= min(5, instance['complexity'])
+        assert len(set(instance['examples'])) == len(instance['examples'])
+        re_com = re.compile(instance['regex'])
+        assert all(re_com.fullmatch(ex) for ex in instance['examples'])
+    # the complexity of a|a counts 2 strings, of which 1 is distinct:
+    result = regex_generator._add_sampled_examples({
+        'regex': 'a|a', 'compiled': re.compile('a|a'), 'complexity': 2,
+        'pattern': Union([Chars('a', 'a')] * 2)})
+    assert result['examples'] == ['a'] and regex_generator._has_example_count(result)
+
+
+def test_candidate_limits():
+    from random_regex.generator.engine import Chars, Union
+    from random_regex.generator.generator import OVER_LIMITS
+    regex_generator = RegexGenerator(seed=0, max_complexity=100,
+                                     candidate_strings=10, candidate_seconds=1.,
+                                     candidate_retries=5)
+    results = regex_generator.generate()
+    assert all(next(results)['complexity'] <= 10 for _ in range(20))
+    assert regex_generator.stats.snapshot()['stages']['limits']['rejected'] > 0
+    result = regex_generator._add_example({
+        'regex': 'a', 'compiled': re.compile('(?!)'), 'pattern': Chars('a', 'a')})
+    assert result['example'] is None
+    assert tuple() is not OVER_LIMITS and not isinstance(OVER_LIMITS, (list, tuple))
+    # the draws of the sampling stop after candidate_retries draws of no new example:
+    draws = []
+    regex_generator = RegexGenerator(sample_size=5, candidate_retries=3)
+    regex_generator._rng = type('Rng', (), {'randrange': lambda _, n: draws.append(n) or 0})()
+    result = regex_generator._add_sampled_examples({
+        'regex': 'a|a', 'compiled': re.compile('a|a'), 'complexity': 20,
+        'pattern': Union([Chars('a', 'a')] * 20)})
+    assert result['examples'] == ['a'] and len(draws) == 5
+
+
+def test_memo():
+    regex_generator = RegexGenerator(seed=0, max_complexity=10 ** 4,
+                                     max_length=30, memo_size=64)
+    results = regex_generator.generate()
+    for _ in range(50):
+        instance = next(results)
+        re_com = re.compile(instance['regex'])
+        assert all(re_com.fullmatch(ex) for ex in instance['examples'])
+    info = regex_generator.memo.info()
+    assert info['hits'] + info['misses'] > 0 and info['size'] <= 64
+    assert RegexGenerator().memo is None
+
+
+def test_packed_examples():
+    from random_regex.generator.examples import PackedExamples
+    plain = RegexGenerator(seed=0, max_complexity=100)
+    packed = RegexGenerator(seed=0, max_complexity=100, packed_examples=True)
+    for expected, instance in zip(islice(plain.generate(), 20), packed.generate()):
+        assert isinstance(instance['examples'], PackedExamples)
+        assert instance['examples'] == expected['examples']
+        assert list(instance['examples']) == expected['examples']
+        assert instance['examples'].all_fullmatch(re.compile(instance['regex']))
+        assert pickle.loads(pickle.dumps(instance)) == instance
+    examples = PackedExamples.pack(['a', '\xe9t\xe9', '', 'b'])
+    assert list(examples) == ['a', '\xe9t\xe9', '', 'b']
+    assert examples[1] == examples[-3] == '\xe9t\xe9' and examples[1:3] == ['\xe9t\xe9', '']
+    assert examples.all_fullmatch(re.compile('[ab]|\\w+|'))
+    assert not examples.all_fullmatch(re.compile('\\w+'))
+    assert not PackedExamples.pack(['a', 'b']).all_fullmatch(re.compile('a'))
+    assert packed._packed(['a', 'b'], re.compile('a')) is None
+    assert packed._packed(['a', 'b'], re.compile('[ab]')) == ['a', 'b']
+    pytest.importorskip('pyarrow')
+    assert examples.to_arrow().to_pylist() == list(examples)
+
+
+def test_quotas():
+    from random_regex.generator.quota import Quotas
+    quotas = Quotas((3, 10, 100), (1, 8, 20), {(0, 0): 5, (0, 1): 3, (1, 0): 4, (1, 1): 2})
+    regex_generator = RegexGenerator(seed=0, max_complexity=100, max_length=20)
+    results = list(regex_generator.generate(quotas=quotas))
+    assert quotas.done and len(results) == 14
+    assert quotas.counts == quotas.targets
+    assert all(quotas.bucket(x['complexity'], x['length']) is not None for x in results)
+    assert all(b['count'] == b['target'] for b in quotas.info()['buckets'])
+    assert quotas.bucket(100, 5) is None and quotas.bucket(3, 0) is None
+    with pytest.raises(AssertionError):
+        next(regex_generator.generate(workers=2, quotas=quotas))
+    # the count_floor of constrained is kept within the buckets:
+    quotas = Quotas((3, 10, 100), (1, 8, 20), 5)
+    regex_generator = RegexGenerator(seed=0, max_complexity=100, max_length=20,
+                                     constrained=True)
+    assert len(list(regex_generator.generate(quotas=quotas))) == 20
+    stage = regex_generator.stats.snapshot()['stages']['complexity']
+    assert stage['rejected'] <= 0.01 * stage['calls']
+    # buckets out of the bounds, or out of reach:
+    with pytest.raises(AssertionError, match='beyond'):
+        regex_generator.generate(quotas=Quotas((3, 100, 200), (1, 8), 1))
+    quotas = Quotas((200, 1000), (1, 2), 1, patience=500)
+    with pytest.raises(RuntimeError, match='out of reach'):
+        next(RegexGenerator(seed=0, max_complexity=1000).generate(quotas=quotas))
@@ -0,0 +1,60 @@
+import functools
+import gzip
+import json
+import os
+from itertools import islice
+import pytest
+from random_regex import RegexGenerator
+from random_regex.cli import main
+
+
+def test_cli_jsonl_shards(tmp_path):
+    main(['--output', str(tmp_path), '--count', '25',
+          '--shard-size', '10', '--buffer-size', '4', '--seed', '0'])
+    records = []
+    for i in range(3):
+        with gzip.open(os.path.join(tmp_path, f'part-{i:05d}.jsonl.gz'), 'rt') as f:
+            shard = [json.loads(line) for line in f]
+        with open(os.path.join(tmp_path, f'part-{i:05d}.meta.json')) as f:
+            meta = json.load(f)
+        assert meta['records'] == len(shard)
+        assert meta['rng']['seed'] == 0
+        records.extend(shard)
+    assert len(records) == 25
+    assert len(set(x['regex'] for x in records)) == 25
+    assert all(len(x['examples']) == x['complexity'] for x in records)
+
+
+def test_cli_dedup_commits_written_shards(tmp_path):
+    from random_regex.generator.dedup import MmapDedupStore
+    path = str(tmp_path / 'seen.dedup')
+    argv = ['--output', str(tmp_path / 'a'), '--count', '25', '--shard-size', '10',
+            '--seed', '0', '--dedup', path]
+    main(argv)
+    store = MmapDedupStore(path=path)
+    assert len(store) == 25 and store.commits == 3
+    # added by a run stopped before writing its shard:
+    store.rollback(store.commits)
+    store.add('lost')
+    store.close()
+    main(argv[:1] + [str(tmp_path / 'b')] + argv[2:])
+    store = MmapDedupStore(path=path)
+    assert len(store) == 50 and 'lost' not in store
+    store.close()
+    # the items of an API run, which never commits, are kept:
+    api = RegexGenerator(bloom_cls=functools.partial(MmapDedupStore, path=path), seed=1)
+    regexes = [x['regex'] for x in islice(api.generate(), 10)]
+    api.bloom.close()
+    assert not os.path.getsize(path + '.journal')
+    main(argv[:1] + [str(tmp_path / 'c')] + argv[2:])
+    store = MmapDedupStore(path=path)
+    assert len(store) == 85 and all(x in store for x in regexes)
+
+
+def test_cli_parquet_shards(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    main(['--output', str(tmp_path), '--count', '15',
+          '--shard-size', '10', '--format', 'parquet'])
+    tables = [pq.read_table(os.path.join(tmp_path, f'part-{i:05d}.parquet'))
+              for i in range(2)]
+    assert [t.num_rows for t in tables] == [10, 5]